@@ -0,0 +1,65 @@
+"""
+Operator endpoints. Only mounted when LINKSCRAPPER_ADMIN_TOKEN is set; every
+request must send it as `X-Admin-Token`.
+"""
+from __future__ import annotations
+
+import asyncio
+import hmac
+import os
+from dataclasses import asdict
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+
+from backend.app.core.rescore import RescoreProgress, rescore_all
+from backend.app.core.result_cache import result_cache
+
+ADMIN_TOKEN = os.getenv("LINKSCRAPPER_ADMIN_TOKEN")
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid or missing admin token")
+
+
+router = APIRouter(prefix="/admin", dependencies=[Depends(require_admin_token)])
+
+_rescore: Optional[RescoreProgress] = None
+
+MAX_BATCH_SIZE = 10_000
+MAX_WORKERS = os.cpu_count() or 1
+
+
+@router.post("/rescore", status_code=202)
+async def start_rescore(
+    batch_size: int = Query(500, ge=1, le=MAX_BATCH_SIZE),
+    workers: Optional[int] = Query(None, ge=1, le=MAX_WORKERS),
+):
+    """
+    Start re-scoring stored analyses in the background (resumes from the
+    checkpoint if a previous run was interrupted). Poll GET /admin/rescore.
+    """
+    global _rescore
+    if _rescore is not None and _rescore.running:
+        raise HTTPException(status_code=409, detail="Re-score already running")
+
+    _rescore = RescoreProgress(running=True)
+    loop = asyncio.get_running_loop()
+    loop.run_in_executor(
+        None,
+        lambda: rescore_all(
+            batch_size=batch_size,
+            workers=workers,
+            progress=_rescore,
+            on_batch=lambda _: result_cache.clear(),
+        ),
+    )
+    return asdict(_rescore)
+
+
+@router.get("/rescore")
+def rescore_status():
+    if _rescore is None:
+        return {"running": False}
+    return asdict(_rescore)
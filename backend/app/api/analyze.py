@@ -1,22 +1,108 @@
 from __future__ import annotations
 
-import asyncio
-import json
-from datetime import datetime
+import gzip
+import hashlib
+import logging
+from dataclasses import asdict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional, Tuple
 from uuid import uuid4
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 
-from backend.app.core.fetcher import fetch_url
+from backend.app.core import jobqueue, reputation, webhooks
+from backend.app.core.allowlist import allowlisted
+from backend.app.core.concurrency import controller as concurrency_controller
+from backend.app.core.fetcher import DEFAULT_TOTAL_BUDGET_SECONDS, fetch_url
+from backend.app.core.metrics import (
+    ALLOWLIST_SKIPPED_FETCHES,
+    COALESCED_FETCHES,
+    DB_COMMIT_SECONDS,
+    JOBS_IN_FLIGHT,
+    JOBS_TOTAL,
+    STAGE_SECONDS,
+)
+from backend.app.core.profiling import maybe_profile
+from backend.app.core.scheduler import JobScheduler
 from backend.app.core.scoring import assess_risk
-from backend.app.core.signals import extract_signals
+from backend.app.core.result_cache import RESULT_CACHE_TTL_SECONDS, CachedResult, result_cache
+from backend.app.core.serialization import dump_result, dumps, result_bytes
+from backend.app.core.signals import KNOWN_SHORTENERS, extract_signals
+from backend.app.core.singleflight import SingleFlight
+from backend.app.core.tracing import span
 from backend.app.db import SessionLocal, get_db
 from backend.app.models.db_models import Analysis
-from backend.app.models.schemas import AnalyzeRequest, AnalyzeAccepted
+from backend.app.models.schemas import AnalyzeAccepted, AnalyzeBatchAccepted, AnalyzeBatchRequest, AnalyzeRequest
+from backend.app.utils.urls import normalize_url
 from backend.app.core.features import signals_to_features
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Start a second GET for a hop that is still pending after this many seconds.
+HEDGE_AFTER_SECONDS = 3.0
+
+# Identical URLs analyzed at the same time share one fetch.
+_fetches = SingleFlight()
+
+# Shares job concurrency between the interactive/bulk/background lanes.
+scheduler = JobScheduler()
+concurrency_controller.attach(scheduler)
+
+
+def _commit(db: Session) -> None:
+    with DB_COMMIT_SECONDS.time():
+        db.commit()
+
+
+def _allowlisted_payload(analysis_id: str, input_url: str, entry: str) -> dict:
+    """
+    Result for a known-benign host: no fetch, so no HTTP fields and no
+    features (keeps these rows out of exported training data).
+    """
+    return {
+        "analysis_id": analysis_id,
+        "url": input_url,
+        "status": "done",
+        "message": "Risk low (0/100)",
+        "final_url": input_url,
+        "http_status": None,
+        "redirect_chain": [input_url],
+        "content_type": None,
+        "server": None,
+        "truncated": False,
+        "allowlisted": True,
+        "risk_score": 0,
+        "risk_level": "low",
+        "reasons": [f"Host is on the known-benign allowlist ({entry}); fetch skipped"],
+        "features": None,
+    }
+
+
+def _holds_lease(db: Session, analysis_id: str, lease_owner: Optional[str]) -> bool:
+    """
+    For queue workers: check the lease is still ours and lock the row for
+    the rest of the transaction, so the write that follows cannot land
+    after another worker reclaimed the job. Must run before the row's
+    attributes are changed (the ORM would flush them first).
+    """
+    if lease_owner is None:
+        return True
+    result = db.execute(
+        update(Analysis)
+        .where(Analysis.id == analysis_id, Analysis.lease_owner == lease_owner, Analysis.status == "running")
+        .values(lease_owner=lease_owner)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 1:
+        return True
+    db.rollback()
+    logger.warning("%s lost the lease on %s; dropping its result", lease_owner, analysis_id)
+    JOBS_TOTAL.inc(status="lease_lost")
+    return False
 
 
 async def run_analysis_job(
@@ -24,86 +110,179 @@ async def run_analysis_job(
     input_url: str,
     follow_redirects: bool,
     max_redirects: int,
+    time_budget_seconds: float = DEFAULT_TOTAL_BUDGET_SECONDS,
+    lease_owner: Optional[str] = None,
 ) -> None:
     """
     Background job:
     - marks DB row as running
     - fetches URL and computes signals + risk
     - stores final result in DB
+
+    Queue workers pass `lease_owner`; status writes then only happen while
+    that worker still holds the job's lease.
     """
-    db = SessionLocal()
-    try:
-        row = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-        if not row:
-            return
+    JOBS_IN_FLIGHT.inc()
 
-        row.status = "running"
-        row.progress = 10
-        row.progress_message = "Starting network fetch..."
-        row.updated_at = datetime.utcnow()
-        db.commit()
+    with maybe_profile(analysis_id), span("analysis", analysis_id=analysis_id, url=input_url):
+        db = SessionLocal()
+        try:
+            row = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+            if not row:
+                return
 
-        fetch_result = await fetch_url(
-            url=input_url,
-            follow_redirects=follow_redirects,
-            max_redirects=max_redirects,
-        )
+            skip_fetch, allow_entry = allowlisted(input_url, KNOWN_SHORTENERS)
+            if skip_fetch and not reputation.lookup(input_url)[0]:
+                ALLOWLIST_SKIPPED_FETCHES.inc()
+                if not _holds_lease(db, analysis_id, lease_owner):
+                    return
+                row.status = "done"
+                row.progress = 100
+                row.progress_message = "Complete"
+                row.result_blob = dump_result(_allowlisted_payload(analysis_id, input_url, allow_entry))
+                row.error = None
+                row.updated_at = datetime.utcnow()
+                webhooks.enqueue(db, row)
+                _commit(db)
+                JOBS_TOTAL.inc(status="done")
+                return
 
-        row.progress = 40
-        row.progress_message = "Extracting URL signals..."
-        row.updated_at = datetime.utcnow()
-        db.commit()
+            if not _holds_lease(db, analysis_id, lease_owner):
+                return
+            row.status = "running"
+            row.progress = 10
+            row.progress_message = "Starting network fetch..."
+            row.updated_at = datetime.utcnow()
+            _commit(db)
 
-        signals = extract_signals(fetch_result)
-        
-        row.progress = 60
-        row.progress_message = "Computing features..."
-        row.updated_at = datetime.utcnow()
-        db.commit()
+            with STAGE_SECONDS.time(stage="fetch"), span("fetch_url") as attrs:
+                # The budget is part of the key so no job waits longer than its own.
+                # Hops are archived under the leader's ID only; replaying a
+                # follower falls back to the capture for the same URL.
+                fetch_result, shared = await _fetches.do(
+                    (normalize_url(input_url), follow_redirects, max_redirects, time_budget_seconds),
+                    lambda: fetch_url(
+                        url=input_url,
+                        follow_redirects=follow_redirects,
+                        max_redirects=max_redirects,
+                        total_budget_seconds=time_budget_seconds,
+                        hedge_after_seconds=HEDGE_AFTER_SECONDS,
+                        archive_key=analysis_id,
+                    ),
+                )
+                attrs["coalesced"] = shared
+            if shared:
+                COALESCED_FETCHES.inc()
 
-        features = signals_to_features(signals)
+            row.progress = 40
+            row.progress_message = "Extracting URL signals..."
+            row.updated_at = datetime.utcnow()
+            _commit(db)
 
-        row.progress = 80
-        row.progress_message = "Assessing risk..."
-        row.updated_at = datetime.utcnow()
-        db.commit()
+            with STAGE_SECONDS.time(stage="signals"), span("extract_signals"):
+                signals = extract_signals(fetch_result)
 
-        assessment = assess_risk(signals)
-
-        payload = {
-            "analysis_id": analysis_id,
-            "url": input_url,
-            "status": "done",
-            "message": f"Risk {assessment.risk_level} ({assessment.risk_score}/100)",
-            "final_url": fetch_result.final_url,
-            "http_status": fetch_result.status_code,
-            "redirect_chain": fetch_result.redirect_chain,
-            "content_type": fetch_result.content_type,
-            "server": fetch_result.server,
-            "risk_score": assessment.risk_score,
-            "risk_level": assessment.risk_level,
-            "reasons": assessment.reasons,
-            "features": features
-        }
-
-        row.status = "done"
-        row.progress = 100
-        row.progress_message = "Complete"
-        row.result_json = json.dumps(payload)
-        row.error = None
-        row.updated_at = datetime.utcnow()
-        db.commit()
+            row.progress = 60
+            row.progress_message = "Computing features..."
+            row.updated_at = datetime.utcnow()
+            _commit(db)
+
+            with STAGE_SECONDS.time(stage="features"), span("signals_to_features"):
+                features = signals_to_features(signals)
+
+            row.progress = 80
+            row.progress_message = "Assessing risk..."
+            row.updated_at = datetime.utcnow()
+            _commit(db)
+
+            with STAGE_SECONDS.time(stage="scoring"), span("assess_risk"):
+                assessment = assess_risk(signals)
+
+            payload = {
+                "analysis_id": analysis_id,
+                "url": input_url,
+                "status": "done",
+                "message": f"Risk {assessment.risk_level} ({assessment.risk_score}/100)",
+                "final_url": fetch_result.final_url,
+                "http_status": fetch_result.status_code,
+                "redirect_chain": fetch_result.redirect_chain,
+                "content_type": fetch_result.content_type,
+                "server": fetch_result.server,
+                "truncated": fetch_result.truncated,
+                # kept so stored rows can be re-scored without refetching
+                "headers": fetch_result.headers,
+                "page": asdict(fetch_result.page) if fetch_result.page else None,
+                "risk_score": assessment.risk_score,
+                "risk_level": assessment.risk_level,
+                "reasons": assessment.reasons,
+                "features": features
+            }
 
-    except Exception as e:
-        row = db.query(Analysis).filter(Analysis.id == analysis_id).first()
-        if row:
-            row.status = "error"
-            row.error = str(e)
-            row.progress_message = f"Error: {str(e)}"
+            if not _holds_lease(db, analysis_id, lease_owner):
+                return
+            row.status = "done"
+            row.progress = 100
+            row.progress_message = "Complete"
+            row.result_blob = dump_result(payload)
+            row.error = None
             row.updated_at = datetime.utcnow()
-            db.commit()
-    finally:
-        db.close()
+            webhooks.enqueue(db, row)  # same commit as the result
+            _commit(db)
+            JOBS_TOTAL.inc(status="done")
+
+        except Exception as e:
+            db.rollback()
+            if not _holds_lease(db, analysis_id, lease_owner):
+                return
+            row = db.query(Analysis).filter(Analysis.id == analysis_id).first()
+            if row:
+                row.status = "error"
+                row.error = str(e)
+                row.progress_message = f"Error: {str(e)}"
+                row.updated_at = datetime.utcnow()
+                webhooks.enqueue(db, row)
+                _commit(db)
+            JOBS_TOTAL.inc(status="error")
+        finally:
+            JOBS_IN_FLIGHT.dec()
+            db.close()
+
+
+def _new_job(analyze_request: AnalyzeRequest, callback_url: Optional[str]) -> Analysis:
+    if callback_url:
+        reason = webhooks.callback_url_error(callback_url)
+        if reason:
+            raise HTTPException(status_code=400, detail=reason)
+    return Analysis(
+        id=str(uuid4()),
+        input_url=str(analyze_request.url),
+        status="queued",
+        progress=0,
+        progress_message="Job queued",
+        updated_at=datetime.utcnow(),
+        priority=analyze_request.priority,
+        follow_redirects=analyze_request.follow_redirects,
+        max_redirects=analyze_request.max_redirects,
+        time_budget_seconds=analyze_request.time_budget_seconds,
+        callback_url=callback_url,
+        # Queue mode: left for worker processes to claim
+        lease_owner=None if jobqueue.queue_mode() else jobqueue.INLINE_OWNER,
+    )
+
+
+def _submit_inline(row: Analysis) -> None:
+    if jobqueue.queue_mode():
+        return
+    scheduler.submit(
+        row.priority,
+        lambda: run_analysis_job(
+            analysis_id=row.id,
+            input_url=row.input_url,
+            follow_redirects=row.follow_redirects,
+            max_redirects=row.max_redirects,
+            time_budget_seconds=row.time_budget_seconds,
+        ),
+    )
 
 
 @router.post("/analyze", response_model=AnalyzeAccepted)
@@ -114,49 +293,142 @@ async def analyze(
     """
     Create a new analysis job row, enqueue async processing, return analysis_id immediately.
     """
-    analysis_id = str(uuid4())
-    input_url = str(analyze_request.url)
-
-    row = Analysis(
-        id=analysis_id,
-        input_url=input_url,
-        status="queued",
-        progress=0,
-        progress_message="Job queued",
-        updated_at=datetime.utcnow(),
-    )
+    callback_url = str(analyze_request.callback_url) if analyze_request.callback_url else None
+    row = _new_job(analyze_request, callback_url)
     db.add(row)
     db.commit()
-
-    asyncio.create_task(
-        run_analysis_job(
-            analysis_id=analysis_id,
-            input_url=input_url,
-            follow_redirects=analyze_request.follow_redirects,
-            max_redirects=analyze_request.max_redirects,
-        )
-    )
+    _submit_inline(row)
 
     return {
-        "analysis_id": analysis_id,
+        "analysis_id": row.id,
         "status": "queued",
         "message": "Job queued. Use GET /analysis/{analysis_id} to retrieve results.",
     }
 
 
+@router.post("/analyze/batch", response_model=AnalyzeBatchAccepted)
+async def analyze_batch(
+    batch: AnalyzeBatchRequest,
+    db: Session = Depends(get_db),
+):
+    """
+    Enqueue several analyses in one transaction. The batch callback_url
+    applies to items without their own.
+    """
+    rows = []
+    for item in batch.items:
+        callback = item.callback_url or batch.callback_url
+        rows.append(_new_job(item, str(callback) if callback else None))
+    db.add_all(rows)
+    db.commit()
+    for row in rows:
+        _submit_inline(row)
+
+    return {
+        "analysis_ids": [r.id for r in rows],
+        "status": "queued",
+        "message": f"{len(rows)} jobs queued.",
+    }
+
+
+# Done rows change only when re-scored (new ETag via updated_at): clients
+# may reuse them for as long as our own result cache would, then revalidate.
+# Not "public": results are per-submission and should stay out of shared caches.
+DONE_CACHE_CONTROL = f"private, max-age={int(RESULT_CACHE_TTL_SECONDS)}, must-revalidate"
+# In-progress rows: clients may store the response but must revalidate
+PENDING_CACHE_CONTROL = "no-cache"
+
+
+def _validators(analysis_id: str, updated_at: datetime) -> Tuple[str, str]:
+    """
+    (ETag, Last-Modified) for a row; both change whenever updated_at does.
+    """
+    version = f"{analysis_id}:{updated_at.isoformat()}"
+    etag = 'W/"' + hashlib.blake2b(version.encode("utf-8"), digest_size=12).hexdigest() + '"'
+    return etag, format_datetime(updated_at.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def _opaque_tag(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def _not_modified(request: Request, etag: str, updated_at: datetime) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison (RFC 9110 13.1.2); If-Modified-Since is ignored
+        tags = {_opaque_tag(t) for t in if_none_match.split(",")}
+        return "*" in tags or _opaque_tag(etag) in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        # Last-Modified has one-second resolution
+        return updated_at.replace(microsecond=0) <= since
+    return False
+
+
+def _stored_result_response(cached: CachedResult, request: Request) -> Response:
+    """
+    Send the stored JSON bytes as-is; gzip-stored results are passed through
+    when the client accepts gzip and inflated otherwise.
+    """
+    headers = {
+        "ETag": cached.etag,
+        "Last-Modified": cached.last_modified,
+        "Cache-Control": DONE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if _not_modified(request, cached.etag, cached.updated_at):
+        return Response(status_code=304, headers=headers)
+
+    blob = cached.blob
+    if cached.compressed:
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            blob = gzip.decompress(blob)
+    return Response(content=blob, media_type="application/json", headers=headers)
+
+
 @router.get("/analysis/{analysis_id}")
-def get_analysis(analysis_id: str, db: Session = Depends(get_db)):
+def get_analysis(analysis_id: str, request: Request, db: Session = Depends(get_db)):
     """
     Retrieve analysis status or final result from the database.
+
+    Responses carry ETag/Last-Modified, and conditional requests get a 304.
+    Completed results are served from an in-process LRU without a DB read.
     """
+    cached = result_cache.get(analysis_id)
+    if cached is not None:
+        return _stored_result_response(cached, request)
+
     row = db.query(Analysis).filter(Analysis.id == analysis_id).first()
     if not row:
         raise HTTPException(status_code=404, detail="Analysis not found")
 
-    if row.status == "done" and row.result_json:
-        return json.loads(row.result_json)
+    etag, last_modified = _validators(row.id, row.updated_at)
+    stored = result_bytes(row) if row.status == "done" else None
+    if stored is not None:
+        cached = CachedResult(
+            blob=stored[0],
+            compressed=stored[1],
+            updated_at=row.updated_at,
+            etag=etag,
+            last_modified=last_modified,
+        )
+        result_cache.put(row.id, cached)
+        return _stored_result_response(cached, request)
 
-    return {
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": PENDING_CACHE_CONTROL}
+    if _not_modified(request, etag, row.updated_at):
+        return Response(status_code=304, headers=headers)
+    status = {
         "analysis_id": row.id,
         "url": row.input_url,
         "status": row.status,
@@ -164,3 +436,4 @@ def get_analysis(analysis_id: str, db: Session = Depends(get_db)):
         "progress_message": row.progress_message,
         "error": row.error,
     }
+    return Response(content=dumps(status), media_type="application/json", headers=headers)
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import FrozenSet, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_ALLOWLIST_PATH = Path(__file__).resolve().parents[1] / "data" / "allowlist.txt"
+ALLOWLIST_PATH = Path(os.getenv("LINKSCRAPPER_ALLOWLIST", str(DEFAULT_ALLOWLIST_PATH)))
+
+
+class Allowlist:
+    """
+    Known-benign hosts.
+
+    Entries are either exact hosts ("www.example.com") or domain suffixes
+    written with a leading dot or "*." (".example.com" matches example.com and
+    every subdomain). A lookup walks the host's parent domains, so it costs one
+    set probe per label.
+    """
+
+    def __init__(self, entries: Iterable[str] = ()):
+        exact, suffixes = set(), set()
+        for raw in entries:
+            entry = raw.strip().lower().rstrip(".")
+            if not entry or entry.startswith("#"):
+                continue
+            if entry.startswith("*."):
+                suffixes.add(entry[2:])
+            elif entry.startswith("."):
+                suffixes.add(entry[1:])
+            else:
+                exact.add(entry)
+        self._exact: FrozenSet[str] = frozenset(exact)
+        self._suffixes: FrozenSet[str] = frozenset(suffixes)
+
+    def __len__(self) -> int:
+        return len(self._exact) + len(self._suffixes)
+
+    def match(self, host: Optional[str]) -> Optional[str]:
+        """
+        Returns the matching entry, or None.
+        """
+        if not host:
+            return None
+        host = host.lower().rstrip(".")
+        if host in self._exact:
+            return host
+        labels = host.split(".")
+        for i in range(len(labels) - 1):
+            candidate = ".".join(labels[i:])
+            if candidate in self._suffixes:
+                return f".{candidate}"
+        return None
+
+
+def load_allowlist(path: Path = ALLOWLIST_PATH) -> Allowlist:
+    if not path.exists():
+        return Allowlist()
+    with path.open("r", encoding="utf-8") as f:
+        return Allowlist(f)
+
+
+allowlist = load_allowlist()
+
+
+def allowlisted(url: str, shorteners: Iterable[str] = ()) -> Tuple[bool, Optional[str]]:
+    """
+    (skip_fetch, matched_entry). Shorteners are never skipped: where they
+    point is the whole question. Neither is anything but the root page of an
+    allowlisted host: trusted sites often run open redirectors
+    (/url?q=..., /redirect?q=...) that phishing links route through.
+    """
+    parsed = urlparse(url)
+    host = parsed.hostname
+    if host and host.lower() in shorteners:
+        return False, None
+    if parsed.path not in ("", "/") or parsed.query or parsed.params:
+        return False, None
+    entry = allowlist.match(host)
+    return entry is not None, entry
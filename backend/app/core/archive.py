@@ -0,0 +1,154 @@
+"""
+Record/replay archive of fetch hops.
+
+Capture (LINKSCRAPPER_FETCH_ARCHIVE=<path>): every hop fetch_url makes is
+appended to the archive with its status, headers and the part of the body
+that was actually read (see html_inspect), keyed by analysis ID.
+
+Replay (LINKSCRAPPER_FETCH_REPLAY=<path>, or ReplayTransport directly): the
+shared fetch client answers from the archive instead of the network, so
+signals/scoring changes can be re-run over whole datasets offline.
+
+File format: append-only sequence of records, each
+    u32 little-endian length + zlib-compressed JSON
+written by a background thread (ArchiveWriter), so a crash can at worst
+lose the records still queued and a truncated tail record.
+"""
+from __future__ import annotations
+
+import atexit
+import base64
+import json
+import os
+import struct
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import httpx
+
+from backend.app.utils.background_writer import BackgroundAppender
+
+ARCHIVE_PATH = os.getenv("LINKSCRAPPER_FETCH_ARCHIVE")
+REPLAY_PATH = os.getenv("LINKSCRAPPER_FETCH_REPLAY")
+
+# Request extension carrying the archive key (analysis ID) down to the transport
+ARCHIVE_KEY_EXTENSION = "linkscrapper.archive_key"
+
+_LEN = struct.Struct("<I")
+
+
+def _encode_record(record: Dict) -> bytes:
+    record["body"] = base64.b64encode(record["body"]).decode("ascii")
+    blob = zlib.compress(json.dumps(record).encode("utf-8"))
+    return _LEN.pack(len(blob)) + blob
+
+
+class ArchiveWriter:
+    """
+    Appends from the event loop only enqueue; a background thread encodes,
+    compresses and writes records in order. close() (also run at exit)
+    writes out whatever is still queued.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._out = BackgroundAppender(path, _encode_record, name="fetch-archive")
+
+    def append(
+        self,
+        key: str,
+        url: str,
+        status_code: int,
+        http_version: str,
+        headers: List[Tuple[str, str]],
+        body: bytes,
+    ) -> None:
+        self._out.put({
+            "key": key,
+            "url": url,
+            "status": status_code,
+            "http_version": http_version,
+            "headers": headers,
+            "body": body,
+        })
+
+    def close(self) -> None:
+        self._out.close()
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    with open(path, "rb") as f:
+        while True:
+            head = f.read(_LEN.size)
+            if len(head) < _LEN.size:
+                return
+            (n,) = _LEN.unpack(head)
+            blob = f.read(n)
+            if len(blob) < n:
+                return  # truncated tail record
+            record = json.loads(zlib.decompress(blob))
+            record["body"] = base64.b64decode(record["body"])
+            yield record
+
+
+class Archive:
+    """
+    In-memory view of an archive for replay.
+    """
+
+    def __init__(self, path: str):
+        self.by_key: Dict[str, List[Dict]] = {}
+        self._by_key_url: Dict[Tuple[str, str], Dict] = {}
+        self._by_url: Dict[str, Dict] = {}
+        for record in iter_records(path):
+            self.by_key.setdefault(record["key"], []).append(record)
+            self._by_key_url[(record["key"], record["url"])] = record
+            self._by_url[record["url"]] = record  # latest capture wins
+
+    def find(self, url: str, key: Optional[str] = None) -> Optional[Dict]:
+        if key is not None and (key, url) in self._by_key_url:
+            return self._by_key_url[(key, url)]
+        return self._by_url.get(url)
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that serves responses from an Archive. Unknown URLs get a
+    ConnectError, the same as an unreachable host.
+    """
+
+    def __init__(self, archive: Archive):
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        key = request.extensions.get(ARCHIVE_KEY_EXTENSION)
+        record = self.archive.find(str(request.url), key)
+        if record is None:
+            raise httpx.ConnectError(f"Not in archive: {request.url}", request=request)
+        return httpx.Response(
+            status_code=record["status"],
+            headers=record["headers"],
+            content=record["body"],
+            request=request,
+            extensions={"http_version": record["http_version"].encode("ascii")},
+        )
+
+
+writer: Optional[ArchiveWriter] = ArchiveWriter(ARCHIVE_PATH) if ARCHIVE_PATH else None
+if writer is not None:
+    atexit.register(writer.close)
+
+
+@lru_cache(maxsize=1)
+def _replay_archive(path: str) -> Archive:
+    return Archive(path)
+
+
+def replay_transport() -> Optional[ReplayTransport]:
+    """
+    Transport for the shared client when LINKSCRAPPER_FETCH_REPLAY is set.
+    The archive is loaded once per process.
+    """
+    return ReplayTransport(_replay_archive(REPLAY_PATH)) if REPLAY_PATH else None
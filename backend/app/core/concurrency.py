@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import os
+import time
+from typing import List, Optional
+
+from backend.app.core.metrics import CONCURRENCY_ADJUSTMENTS, CONCURRENCY_LIMIT
+
+ADAPTIVE_ENABLED = os.getenv("LINKSCRAPPER_ADAPTIVE_CONCURRENCY", "1") == "1"
+CONCURRENCY_MIN = int(os.getenv("LINKSCRAPPER_CONCURRENCY_MIN", "2"))
+CONCURRENCY_MAX = int(os.getenv("LINKSCRAPPER_CONCURRENCY_MAX", "100"))
+# Hop p90 above this counts as congestion even without errors
+TARGET_P90_SECONDS = float(os.getenv("LINKSCRAPPER_TARGET_P90_SECONDS", "3.0"))
+MAX_ERROR_RATE = 0.1
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD controller for the scheduler's concurrency limit, driven by fetch hops.
+
+    Hops are collected in windows (at least min_samples and interval_seconds).
+    At the end of a window:
+    - timeout/connection error rate above MAX_ERROR_RATE, or p90 latency above
+      the target -> limit *= decrease_factor
+    - otherwise, if the limit was actually being used -> limit += 1
+    The result is clamped to [floor, ceiling].
+    """
+
+    def __init__(
+        self,
+        floor: int = CONCURRENCY_MIN,
+        ceiling: int = CONCURRENCY_MAX,
+        target_p90_seconds: float = TARGET_P90_SECONDS,
+        min_samples: int = 20,
+        interval_seconds: float = 1.0,
+        decrease_factor: float = 0.7,
+    ):
+        self.floor = floor
+        self.ceiling = max(floor, ceiling)
+        self.target_p90_seconds = target_p90_seconds
+        self.min_samples = min_samples
+        self.interval_seconds = interval_seconds
+        self.decrease_factor = decrease_factor
+
+        self._target = None  # object with .limit and .running (JobScheduler)
+        self._latencies: List[float] = []
+        self._errors = 0
+        self._window_start = time.monotonic()
+
+    def attach(self, target) -> None:
+        self._target = target
+        target.limit = min(self.ceiling, max(self.floor, target.limit))
+        CONCURRENCY_LIMIT.set(target.limit)
+
+    def record(self, latency_seconds: Optional[float], error: bool = False) -> None:
+        """
+        One finished hop. `error` is True for timeouts/connection failures,
+        which is the congestion signal (HTTP error statuses are not).
+        """
+        if self._target is None:
+            return
+        if error:
+            self._errors += 1
+        else:
+            self._latencies.append(latency_seconds)
+
+        samples = len(self._latencies) + self._errors
+        now = time.monotonic()
+        if samples >= self.min_samples and now - self._window_start >= self.interval_seconds:
+            self._adjust(samples)
+            self._latencies = []
+            self._errors = 0
+            self._window_start = now
+
+    def _adjust(self, samples: int) -> None:
+        limit = self._target.limit
+        error_rate = self._errors / samples
+
+        p90 = 0.0
+        if self._latencies:
+            ordered = sorted(self._latencies)
+            p90 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))]
+
+        if error_rate > MAX_ERROR_RATE or p90 > self.target_p90_seconds:
+            new_limit = max(self.floor, int(limit * self.decrease_factor))
+            direction = "decrease"
+        elif self._target.running >= limit - 1:
+            new_limit = min(self.ceiling, limit + 1)
+            direction = "increase"
+        else:
+            return
+
+        if new_limit != limit:
+            self._target.limit = new_limit
+            CONCURRENCY_LIMIT.set(new_limit)
+            CONCURRENCY_ADJUSTMENTS.inc(direction=direction)
+
+
+controller = AdaptiveConcurrency()
+
+
+def record_fetch(latency_seconds: Optional[float], error: bool = False) -> None:
+    if ADAPTIVE_ENABLED:
+        controller.record(latency_seconds, error)
@@ -43,4 +43,14 @@ def signals_to_features(s:UrlSignals) -> Dict[str, float]:
     features["is_https"] = 1.0 if s.is_https else 0.0
     features["has_sensitive_keywords"] = 1.0 if s.has_sensitive_keywords else 0.0
 
+    # page content based
+    features["has_password_field"] = 1.0 if s.has_password_field else 0.0
+    features["external_form_action"] = 1.0 if s.external_form_action else 0.0
+    features["has_meta_refresh"] = 1.0 if s.has_meta_refresh else 0.0
+    features["has_script_redirect"] = 1.0 if s.has_script_redirect else 0.0
+
+    # reputation based
+    features["known_malicious_url"] = 1.0 if s.known_malicious_url else 0.0
+    features["known_malicious_host"] = 1.0 if s.known_malicious_host else 0.0
+
     return features
\ No newline at end of file
@@ -1,12 +1,22 @@
 from __future__ import annotations
 
+import asyncio
 import ipaddress
+import os
+import time
+from collections import Counter
 from dataclasses import dataclass
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from urllib.parse import urlparse
 
 import httpx
 
+from backend.app.core import archive
+from backend.app.core.archive import ARCHIVE_KEY_EXTENSION, replay_transport
+from backend.app.core.concurrency import record_fetch
+from backend.app.core.html_inspect import HTML_INSPECT_MAX_BYTES, HtmlInspector, PageSignals
+from backend.app.core.metrics import FETCH_HOP_SECONDS
+from backend.app.core.tracing import httpx_trace_hook, span
 
 @dataclass
 class FetchResult:
@@ -16,6 +26,17 @@ class FetchResult:
     content_type: Optional[str]
     server: Optional[str]
     headers: Dict[str, str]
+    truncated: bool = False  # True when the time budget expired mid-chain
+    page: Optional[PageSignals] = None  # content signals of the final HTML page
+
+# Upper bound for a whole analysis (all hops together), not a single request.
+DEFAULT_TOTAL_BUDGET_SECONDS = 30.0
+
+# Unread bodies up to this size are drained so the connection can be reused
+DRAIN_MAX_BYTES = 16_384
+
+# Opt-in HTTP/2 on the shared client (needs the `h2` package).
+HTTP2_ENABLED = os.getenv("LINKSCRAPPER_HTTP2", "0") == "1"
 
 ALLOWED_RESPONSE_HEADERS = {
     "strict-transport-security",
@@ -46,6 +67,83 @@ def _is_private_host(host: str) -> bool:
         # Not an IP (likely a domain). Allow for MVP.
         return False
 
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_responses_by_protocol: Counter = Counter()
+
+
+def build_client(
+    http2: bool = HTTP2_ENABLED,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+    **kwargs,
+) -> httpx.AsyncClient:
+    """
+    Client used for every hop. Shared so that keep-alive connections (and HTTP/2
+    streams, when enabled) are reused across concurrent analyses.
+    """
+    if transport is None:
+        transport = replay_transport()
+    kwargs.setdefault("limits", httpx.Limits(max_keepalive_connections=20, max_connections=100))
+    return httpx.AsyncClient(
+        follow_redirects=False,  # manual redirect tracking
+        http2=http2,
+        transport=transport,
+        headers={"User-Agent": "LinkScrapper/0.1"},
+        **kwargs,
+    )
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Return the shared client, creating it lazily for the running event loop.
+    """
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        # Connections are bound to the loop they were opened on; a client left
+        # behind by an earlier asyncio.run() cannot be reused.
+        _client = build_client()
+        _client_loop = loop
+    return _client
+
+
+def set_client(client: Optional[httpx.AsyncClient]) -> None:
+    """
+    Replace the shared client (custom transport, benchmarks). None resets it.
+    """
+    global _client, _client_loop
+    _client = client
+    _client_loop = asyncio.get_running_loop() if client is not None else None
+
+
+async def close_client() -> None:
+    global _client, _client_loop
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+def connection_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Open pool connections and completed responses, grouped by protocol.
+    """
+    open_conns: Counter = Counter()
+    pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+    for conn in getattr(pool, "connections", []):
+        info = conn.info()  # e.g. "'https://host:443', HTTP/2, ACTIVE, Request Count: 3"
+        if "HTTP/2" in info:
+            open_conns["HTTP/2"] += 1
+        elif "HTTP/1.1" in info:
+            open_conns["HTTP/1.1"] += 1
+        else:
+            open_conns["connecting"] += 1
+    return {
+        "open_connections": dict(open_conns),
+        "responses": dict(_responses_by_protocol),
+    }
+
+
 def _extract_allowed_headers(resp: httpx.Response) -> Dict[str, str]:
     out: Dict[str, str] = {}
     for k, v in resp.headers.items():
@@ -54,12 +152,142 @@ def _extract_allowed_headers(resp: httpx.Response) -> Dict[str, str]:
             out[lk] = v
     return out
 
+def _is_redirect(resp: httpx.Response) -> bool:
+    return 300 <= resp.status_code < 400 and "location" in resp.headers
+
+
+async def _get_hop(
+    client: httpx.AsyncClient,
+    url: str,
+    max_bytes: int,
+    timeout: httpx.Timeout,
+    archive_key: Optional[str] = None,
+) -> Tuple[httpx.Response, Optional[PageSignals]]:
+    """
+    One GET for a single hop. The body is streamed and only read when it is
+    an HTML page (not a redirect), and only as far as the HTML inspector needs.
+    """
+    t0 = time.perf_counter()
+    page: Optional[PageSignals] = None
+    with span("fetch.hop", url=url) as attrs:
+        extensions = {}
+        trace_hook = httpx_trace_hook()
+        if trace_hook:
+            extensions["trace"] = trace_hook
+        if archive_key:
+            extensions[ARCHIVE_KEY_EXTENSION] = archive_key
+        request = client.build_request("GET", url, timeout=timeout, extensions=extensions)
+        captured: List[bytes] = []
+        try:
+            resp = await client.send(request, stream=True)
+        except (httpx.TimeoutException, httpx.NetworkError):
+            record_fetch(None, error=True)
+            raise
+
+        try:
+            _responses_by_protocol[resp.http_version] += 1
+            attrs["http.status_code"] = resp.status_code
+            attrs["http.flavor"] = resp.http_version
+
+            # Size cap: refuse declared oversize bodies up front, and never
+            # read more than max_bytes of a body we do stream.
+            declared = resp.headers.get("content-length", "")
+            if declared.isdigit() and int(declared) > max_bytes:
+                raise ValueError("Response too large (size limit exceeded)")
+
+            content_type = resp.headers.get("content-type", "").lower()
+            if not _is_redirect(resp) and "text/html" in content_type:
+                inspector = HtmlInspector(
+                    str(resp.url),
+                    charset=resp.charset_encoding,
+                    max_bytes=min(max_bytes, HTML_INSPECT_MAX_BYTES),
+                )
+                complete = True
+                async for chunk in resp.aiter_bytes():
+                    if archive.writer is not None:
+                        captured.append(chunk)
+                    if not inspector.feed(chunk):
+                        complete = False
+                        break
+                page = inspector.close(complete)
+                attrs["html.bytes_read"] = page.bytes_read
+            elif not declared.isdigit() or int(declared) <= DRAIN_MAX_BYTES:
+                # Closing an unread response drops the connection; read small
+                # bodies (redirects, error pages) so it goes back to the pool.
+                # Chunked bodies are read up to the same cap.
+                drained = 0
+                async for chunk in resp.aiter_raw():
+                    drained += len(chunk)
+                    if drained > DRAIN_MAX_BYTES:
+                        break
+
+            if archive.writer is not None and archive_key:
+                archive.writer.append(
+                    key=archive_key,
+                    url=str(resp.url),  # as httpx normalized it, which replay looks up
+                    status_code=resp.status_code,
+                    http_version=resp.http_version,
+                    # stored body is decoded and may be cut short
+                    headers=[
+                        (k, v) for k, v in resp.headers.items()
+                        if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+                    ],
+                    body=b"".join(captured),
+                )
+        finally:
+            await resp.aclose()
+
+    elapsed = time.perf_counter() - t0
+    FETCH_HOP_SECONDS.observe(elapsed, protocol=resp.http_version)
+    record_fetch(elapsed)
+    return resp, page
+
+
+async def _hedged_get_hop(
+    client: httpx.AsyncClient,
+    url: str,
+    max_bytes: int,
+    timeout: httpx.Timeout,
+    hedge_after_seconds: Optional[float],
+    archive_key: Optional[str] = None,
+):
+    """
+    Run a hop; if it has not finished after hedge_after_seconds, start a second
+    identical GET and keep whichever completes first. Only used for plain GETs,
+    which are idempotent.
+    """
+    if hedge_after_seconds is None:
+        return await _get_hop(client, url, max_bytes, timeout, archive_key)
+
+    first = asyncio.create_task(_get_hop(client, url, max_bytes, timeout, archive_key))
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after_seconds)
+        if not done:
+            tasks.add(asyncio.create_task(_get_hop(client, url, max_bytes, timeout, archive_key)))
+
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+            if not tasks:
+                # every attempt failed -> surface the first error
+                return next(iter(done)).result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
 async def fetch_url(
     url: str,
     follow_redirects: bool = True,
     max_redirects: int = 10,
     timeout_seconds: float = 10.0,
     max_bytes: int = 512_000,  # 500 KB cap for MVP safety
+    total_budget_seconds: Optional[float] = DEFAULT_TOTAL_BUDGET_SECONDS,
+    hedge_after_seconds: Optional[float] = None,
+    archive_key: Optional[str] = None,
 ) -> FetchResult:
     """
     Safely fetch a URL and track redirects + basic HTTP indicators.
@@ -67,9 +295,14 @@ async def fetch_url(
     Security controls:
     - allow only http/https
     - block private/internal IP hosts (basic SSRF mitigation)
-    - enforce timeout
+    - enforce timeout (per hop and for the whole chain)
     - cap redirects
     - cap downloaded bytes
+
+    If total_budget_seconds runs out after at least one hop, the chain seen so
+    far is returned with truncated=True instead of raising.
+
+    archive_key (the analysis ID) tags hops for the record/replay archive.
     """
 
     parsed = urlparse(url)
@@ -82,61 +315,81 @@ async def fetch_url(
     if _is_private_host(parsed.hostname):
         raise ValueError("Private/internal IP hosts are not allowed")
 
+    deadline = (
+        time.monotonic() + total_budget_seconds
+        if total_budget_seconds is not None
+        else None
+    )
+
     timeout = httpx.Timeout(timeout_seconds)
-    limits = httpx.Limits(max_keepalive_connections=5, max_connections=10)
 
     redirect_chain: List[str] = []
     current = url
+    last_resp: Optional[httpx.Response] = None
 
-    async with httpx.AsyncClient(
-        follow_redirects=False,  # manual redirect tracking
-        timeout=timeout,
-        limits=limits,
-        headers={"User-Agent": "LinkScrapper/0.1"},
-    ) as client:
-        for _ in range(max_redirects + 1):
-            resp = await client.get(current)
-
-            redirect_chain.append(current)
-
-            # Manual size cap: read only up to max_bytes
-            # (We don't need full body today; just basic metadata)
-            content = await resp.aread()
-            if len(content) > max_bytes:
-                raise ValueError("Response too large (size limit exceeded)")
+    client = get_client()
 
-            # Redirect handling
-            if 300 <= resp.status_code < 400 and "location" in resp.headers:
-                if not follow_redirects:
-                    return FetchResult(
-                        final_url=current,
-                        status_code=resp.status_code,
-                        redirect_chain=redirect_chain,
-                        content_type=resp.headers.get("content-type"),
-                        server=resp.headers.get("server"),
-                        headers=_extract_allowed_headers(resp),
-                    )
-
-                next_url = resp.headers["location"]
-
-                # Some redirects give relative locations; httpx can join them via resp.url
-                try:
-                    current = str(resp.url.join(next_url))
-                except Exception:
-                    current = next_url
-
-                continue
-
-            # Not a redirect → final response
+    for _ in range(max_redirects + 1):
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        try:
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError
+            resp, page = await asyncio.wait_for(
+                _hedged_get_hop(
+                    client, current, max_bytes, timeout, hedge_after_seconds, archive_key
+                ),
+                timeout=remaining,
+            )
+        except asyncio.TimeoutError:
+            if last_resp is None:
+                raise ValueError("Time budget exceeded before first response")
+            # Partial result: chain so far, last response we actually saw
             return FetchResult(
-                final_url=str(resp.url),
-                status_code=resp.status_code,
+                final_url=redirect_chain[-1],
+                status_code=last_resp.status_code,
                 redirect_chain=redirect_chain,
-                content_type=resp.headers.get("content-type"),
-                server=resp.headers.get("server"),
-                headers=_extract_allowed_headers(resp)
+                content_type=last_resp.headers.get("content-type"),
+                server=last_resp.headers.get("server"),
+                headers=_extract_allowed_headers(last_resp),
+                truncated=True,
             )
 
+        redirect_chain.append(current)
+        last_resp = resp
+
+        # Redirect handling
+        if _is_redirect(resp):
+            if not follow_redirects:
+                return FetchResult(
+                    final_url=current,
+                    status_code=resp.status_code,
+                    redirect_chain=redirect_chain,
+                    content_type=resp.headers.get("content-type"),
+                    server=resp.headers.get("server"),
+                    headers=_extract_allowed_headers(resp),
+                )
+
+            next_url = resp.headers["location"]
+
+            # Some redirects give relative locations; httpx can join them via resp.url
+            try:
+                current = str(resp.url.join(next_url))
+            except Exception:
+                current = next_url
+
+            continue
+
+        # Not a redirect → final response
+        return FetchResult(
+            final_url=str(resp.url),
+            status_code=resp.status_code,
+            redirect_chain=redirect_chain,
+            content_type=resp.headers.get("content-type"),
+            server=resp.headers.get("server"),
+            headers=_extract_allowed_headers(resp),
+            page=page,
+        )
+
     raise ValueError("Max redirects exceeded")
 
 
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import codecs
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+# Max bytes of an HTML body we are willing to read for content signals
+HTML_INSPECT_MAX_BYTES = 256_000
+
+# `location` must start an identifier (not geolocation/allocation, not obj.location)
+_SCRIPT_REDIRECT_RE = re.compile(
+    r"(?<![\w$.])(?:(?:window|document|top|self)\.)?location"
+    r"(?:(?:\.href)?\s*=(?!=)|\.(?:replace|assign)\s*\()",
+)
+_LEADING_IDENT_RE = re.compile(r"^[\w$.]+")
+# <meta http-equiv=refresh> content with a target ("5; url=..."); a bare delay only reloads the page
+_META_REFRESH_TARGET_RE = re.compile(r"^\s*[\d.]*\s*[;,]\s*(?:url\s*=\s*)?['\"]?\S", re.IGNORECASE)
+
+
+@dataclass
+class PageSignals:
+    has_password_field: bool = False
+    external_form_action: bool = False
+    has_meta_refresh: bool = False
+    has_script_redirect: bool = False
+    bytes_read: int = 0
+    complete: bool = False  # False if we stopped at the byte budget
+
+
+class _Inspector(HTMLParser):
+    def __init__(self, page_url: str):
+        super().__init__(convert_charrefs=True)
+        self.page_url = page_url
+        self.page_host = (urlparse(page_url).hostname or "").lower()
+        self.signals = PageSignals()
+        self._in_script = False
+        self._script_tail = ""  # keeps matches that straddle chunk boundaries
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        a = {k.lower(): (v or "") for k, v in attrs}
+
+        if tag == "input" and a.get("type", "").lower() == "password":
+            self.signals.has_password_field = True
+
+        elif tag == "form":
+            action = a.get("action", "").strip()
+            if action:
+                target = urlparse(urljoin(self.page_url, action))
+                host = (target.hostname or "").lower()
+                if target.scheme in ("http", "https") and host and host != self.page_host:
+                    self.signals.external_form_action = True
+
+        elif tag == "meta" and a.get("http-equiv", "").lower() == "refresh":
+            if _META_REFRESH_TARGET_RE.match(a.get("content", "")):
+                self.signals.has_meta_refresh = True
+
+        elif tag == "script":
+            self._in_script = True
+            self._script_tail = ""
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "script":
+            self._in_script = False
+
+    def handle_data(self, data: str) -> None:
+        if not self._in_script or self.signals.has_script_redirect:
+            return
+        text = self._script_tail + data
+        if _SCRIPT_REDIRECT_RE.search(text):
+            self.signals.has_script_redirect = True
+        # Drop a partial identifier at the cut, or "geo|location =" would match next time
+        self._script_tail = _LEADING_IDENT_RE.sub("", text[-64:])
+
+    @property
+    def done(self) -> bool:
+        s = self.signals
+        return (
+            s.has_password_field
+            and s.external_form_action
+            and s.has_meta_refresh
+            and s.has_script_redirect
+        )
+
+
+class HtmlInspector:
+    """
+    Incremental inspector for a streamed HTML body.
+
+    feed() takes raw byte chunks and returns False once there is nothing left
+    to learn (every signal seen) or the byte budget is spent, so the caller
+    can stop reading the body.
+    """
+
+    def __init__(self, page_url: str, charset: Optional[str] = None, max_bytes: int = HTML_INSPECT_MAX_BYTES):
+        try:
+            decoder_cls = codecs.getincrementaldecoder(charset or "utf-8")
+        except LookupError:
+            decoder_cls = codecs.getincrementaldecoder("utf-8")
+        self._decoder = decoder_cls(errors="replace")
+        self._parser = _Inspector(page_url)
+        self._max_bytes = max_bytes
+
+    @property
+    def signals(self) -> PageSignals:
+        return self._parser.signals
+
+    def feed(self, chunk: bytes) -> bool:
+        s = self._parser.signals
+        room = self._max_bytes - s.bytes_read
+        if room <= 0:
+            return False
+        chunk = chunk[:room]
+        s.bytes_read += len(chunk)
+        self._parser.feed(self._decoder.decode(chunk))
+        return not self._parser.done and s.bytes_read < self._max_bytes
+
+    def close(self, complete: bool) -> PageSignals:
+        """
+        complete=True when the whole body was consumed.
+        """
+        self._parser.feed(self._decoder.decode(b"", final=True))
+        self._parser.close()
+        self._parser.signals.complete = complete
+        return self._parser.signals
@@ -0,0 +1,242 @@
+"""
+Analysis jobs claimed from the shared database by worker processes.
+
+With LINKSCRAPPER_JOB_EXECUTION=queue the API only inserts "queued" rows;
+`python -m backend.app.worker` processes (on any number of hosts sharing the
+database) claim them:
+
+- claim: a queued row, or a running row whose lease expired (its worker
+  died), is taken with a compare-and-set UPDATE, so two workers can never
+  both win a row. On Postgres the candidate SELECT also uses
+  FOR UPDATE SKIP LOCKED so concurrent claimers do not contend on the same
+  rows.
+- heartbeat: the owner pushes lease_expires_at forward while the job runs.
+- a row whose lease has expired MAX_ATTEMPTS times is no longer claimable;
+  a sweep, run about once per lease period rather than on every claim,
+  marks it as an error.
+
+Candidates are read lane by lane, so each SELECT is an index range scan
+(see the Analysis indexes) rather than a sort of the whole queue.
+
+With the default LINKSCRAPPER_JOB_EXECUTION=inline the API process runs
+jobs itself, as before; those rows get lease_owner="inline" so workers
+leave them alone.
+"""
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, func, or_, select, update
+
+from backend.app.core import webhooks
+from backend.app.db import SessionLocal
+from backend.app.models.db_models import Analysis
+
+JOB_EXECUTION = os.getenv("LINKSCRAPPER_JOB_EXECUTION", "inline")
+LEASE_SECONDS = float(os.getenv("LINKSCRAPPER_JOB_LEASE_SECONDS", "30"))
+MAX_ATTEMPTS = int(os.getenv("LINKSCRAPPER_JOB_MAX_ATTEMPTS", "3"))
+SWEEP_INTERVAL_SECONDS = LEASE_SECONDS
+
+INLINE_OWNER = "inline"
+
+# Claim order
+_LANES = ("interactive", "bulk", "background")
+
+_last_sweep = 0.0  # time.monotonic() of this process's last _fail_exhausted
+
+
+@dataclass(frozen=True)
+class ClaimedJob:
+    analysis_id: str
+    input_url: str
+    priority: str
+    follow_redirects: Optional[bool]
+    max_redirects: Optional[int]
+    time_budget_seconds: Optional[float]
+    attempt: int
+
+
+def queue_mode() -> bool:
+    return JOB_EXECUTION == "queue"
+
+
+def _expired(now: datetime):
+    return and_(
+        Analysis.status == "running",
+        Analysis.lease_expires_at < now,
+        func.coalesce(Analysis.attempts, 0) < MAX_ATTEMPTS,
+    )
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Analysis.status == "queued", Analysis.lease_owner.is_(None)),
+        _expired(now),
+    )
+
+
+def _candidates(db, now: datetime, limit: int) -> List[str]:
+    """
+    Ids worth trying to claim: expired leases first (their jobs are the
+    oldest), then queued rows lane by lane, oldest first.
+    """
+    def ids(where, order_by, n: int) -> List[str]:
+        return db.execute(
+            select(Analysis.id)
+            .where(*where)
+            .order_by(order_by)
+            .limit(n)
+            .with_for_update(skip_locked=True)  # not rendered on SQLite
+        ).scalars().all()
+
+    found = ids([_expired(now)], Analysis.lease_expires_at, limit)
+    for lane in _LANES:
+        if len(found) >= limit:
+            break
+        found += ids(
+            [Analysis.status == "queued", Analysis.priority == lane, Analysis.lease_owner.is_(None)],
+            Analysis.created_at,
+            limit - len(found),
+        )
+    return found
+
+
+def _fail_exhausted(db, now: datetime) -> int:
+    exhausted = (
+        Analysis.status == "running",
+        Analysis.lease_expires_at < now,
+        func.coalesce(Analysis.attempts, 0) >= MAX_ATTEMPTS,
+    )
+    failed = 0
+    for row in db.query(Analysis).filter(*exhausted).all():
+        # Per row, so only the process that actually fails a job queues its callback
+        result = db.execute(
+            update(Analysis)
+            .where(Analysis.id == row.id, *exhausted)
+            .values(
+                status="error",
+                error=f"Worker lost the job {MAX_ATTEMPTS} times",
+                progress_message=f"Error: worker lost the job {MAX_ATTEMPTS} times",
+                lease_expires_at=None,
+                updated_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            webhooks.enqueue(db, row)
+            failed += 1
+    return failed
+
+
+def claim_jobs(worker_id: str, limit: int, lease_seconds: float = LEASE_SECONDS) -> List[ClaimedJob]:
+    """
+    Claim up to `limit` jobs, interactive first, oldest first within a lane.
+    """
+    if limit <= 0:
+        return []
+    global _last_sweep
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        if time.monotonic() - _last_sweep >= SWEEP_INTERVAL_SECONDS:
+            _last_sweep = time.monotonic()
+            _fail_exhausted(db, now)
+
+        candidates = _candidates(db, now, limit)
+
+        claimed: List[str] = []
+        for analysis_id in candidates:
+            result = db.execute(
+                update(Analysis)
+                .where(Analysis.id == analysis_id, _claimable(now))
+                .values(
+                    status="running",
+                    lease_owner=worker_id,
+                    lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    attempts=func.coalesce(Analysis.attempts, 0) + 1,
+                    updated_at=now,
+                )
+            )
+            if result.rowcount == 1:
+                claimed.append(analysis_id)
+        db.commit()
+
+        if not claimed:
+            return []
+        rows = db.query(Analysis).filter(Analysis.id.in_(claimed)).all()
+        return [
+            ClaimedJob(
+                analysis_id=r.id,
+                input_url=r.input_url,
+                priority=r.priority or "interactive",
+                follow_redirects=r.follow_redirects,
+                max_redirects=r.max_redirects,
+                time_budget_seconds=r.time_budget_seconds,
+                attempt=r.attempts or 1,
+            )
+            for r in rows
+        ]
+    finally:
+        db.close()
+
+
+def renew_leases(worker_id: str, analysis_ids: Iterable[str], lease_seconds: float = LEASE_SECONDS) -> int:
+    """
+    Heartbeat: extend the leases this worker still holds. Returns how many
+    were extended; a lower count than asked means a lease was lost.
+    """
+    ids = list(analysis_ids)
+    if not ids:
+        return 0
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            update(Analysis)
+            .where(
+                Analysis.id.in_(ids),
+                Analysis.lease_owner == worker_id,
+                Analysis.status == "running",
+            )
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def release_jobs(worker_id: str, analysis_ids: Iterable[str]) -> int:
+    """
+    Hand unfinished jobs back to the queue on shutdown, without counting
+    the attempt.
+    """
+    ids = list(analysis_ids)
+    if not ids:
+        return 0
+    db = SessionLocal()
+    try:
+        result = db.execute(
+            update(Analysis)
+            .where(
+                Analysis.id.in_(ids),
+                Analysis.lease_owner == worker_id,
+                Analysis.status == "running",
+            )
+            .values(
+                status="queued",
+                progress=0,
+                progress_message="Job queued",
+                lease_owner=None,
+                lease_expires_at=None,
+                attempts=func.coalesce(Analysis.attempts, 1) - 1,
+                updated_at=datetime.utcnow(),
+            )
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
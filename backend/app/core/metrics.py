@@ -0,0 +1,299 @@
+"""
+Minimal Prometheus-style metrics (counters, gauges, histograms) rendered in the
+text exposition format by GET /metrics.
+
+Kept dependency-free and cheap on the hot path: an observation is a dict lookup,
+a bisect and a couple of additions under a lock.
+"""
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+LabelKey = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _fmt_labels(names: Tuple[str, ...], values: LabelKey, extra: str = "") -> str:
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        collect: Optional[Callable[[], Dict[LabelKey, float]]] = None,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+        self._collect = collect  # computed at scrape time instead of tracked
+
+    def set(self, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        if self._collect is not None:
+            items = list(self._collect().items())
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[idx] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def count(self, **labels: str) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(c), self._sums[k]) for k, c in self._counts.items()]
+        lines: List[str] = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets + (float("inf"),), counts):
+                cumulative += c
+                le = f'le="{_fmt_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        out: List[str] = []
+        for m in self._metrics:
+            out.append(f"# HELP {m.name} {m.help}")
+            out.append(f"# TYPE {m.name} {m.kind}")
+            out.extend(m.render())
+        return "\n".join(out) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _fetch_connections() -> Dict[LabelKey, float]:
+    # Imported lazily: fetcher imports this module for its hop histogram
+    from backend.app.core.fetcher import connection_stats
+
+    return {(proto,): float(n) for proto, n in connection_stats()["open_connections"].items()}
+
+
+def _webhook_backlog() -> Dict[LabelKey, float]:
+    from backend.app.core.webhooks import outbox_stats
+
+    stats = outbox_stats()
+    return {("pending",): stats["pending"], ("failed",): stats["failed"]}
+
+
+def _webhook_oldest_pending() -> Dict[LabelKey, float]:
+    from backend.app.core.webhooks import outbox_stats
+
+    return {(): outbox_stats()["oldest_pending_seconds"]}
+
+
+STAGE_SECONDS = Histogram(
+    "linkscrapper_stage_seconds",
+    "Time spent in each analysis stage",
+    ("stage",),
+)
+FETCH_HOP_SECONDS = Histogram(
+    "linkscrapper_fetch_hop_seconds",
+    "Latency of a single fetch hop (GET + body read)",
+    ("protocol",),
+)
+QUEUE_WAIT_SECONDS = Histogram(
+    "linkscrapper_queue_wait_seconds",
+    "Time between job enqueue and job start",
+    ("lane",),
+)
+LANE_QUEUE_DEPTH = Gauge(
+    "linkscrapper_lane_queue_depth",
+    "Jobs waiting in each scheduler lane",
+    ("lane",),
+)
+LANE_JOB_SECONDS = Histogram(
+    "linkscrapper_lane_job_seconds",
+    "Enqueue-to-finish time of analysis jobs per scheduler lane",
+    ("lane",),
+)
+DB_COMMIT_SECONDS = Histogram(
+    "linkscrapper_db_commit_seconds",
+    "Latency of DB commits made by analysis jobs",
+)
+JOBS_IN_FLIGHT = Gauge(
+    "linkscrapper_jobs_in_flight",
+    "Analysis jobs currently running",
+)
+JOBS_TOTAL = Counter(
+    "linkscrapper_jobs_total",
+    "Finished analysis jobs by outcome",
+    ("status",),
+)
+CONCURRENCY_LIMIT = Gauge(
+    "linkscrapper_concurrency_limit",
+    "Current limit on concurrently running analysis jobs",
+)
+CONCURRENCY_ADJUSTMENTS = Counter(
+    "linkscrapper_concurrency_adjustments_total",
+    "Changes made by the adaptive concurrency controller",
+    ("direction",),
+)
+COALESCED_FETCHES = Counter(
+    "linkscrapper_coalesced_fetches_total",
+    "Jobs that reused an in-flight fetch of the same URL instead of fetching",
+)
+ALLOWLIST_SKIPPED_FETCHES = Counter(
+    "linkscrapper_allowlist_skipped_fetches_total",
+    "Analyses answered from the known-benign allowlist without fetching",
+)
+WEBHOOK_DELIVERY_SECONDS = Histogram(
+    "linkscrapper_webhook_delivery_seconds",
+    "Time from job completion to successful callback delivery (retries included)",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+WEBHOOK_REQUEST_SECONDS = Histogram(
+    "linkscrapper_webhook_request_seconds",
+    "Latency of callback POSTs by outcome",
+    ("outcome",),
+)
+WEBHOOK_DELIVERIES = Counter(
+    "linkscrapper_webhook_deliveries_total",
+    "Results handed to callback URLs by outcome (delivered/retry/failed)",
+    ("outcome",),
+)
+WEBHOOK_BACKLOG = Gauge(
+    "linkscrapper_webhook_backlog",
+    "Outbox entries waiting for delivery (pending) or given up on (failed)",
+    ("state",),
+    collect=_webhook_backlog,
+)
+WEBHOOK_OLDEST_PENDING_SECONDS = Gauge(
+    "linkscrapper_webhook_oldest_pending_seconds",
+    "Age of the oldest undelivered outbox entry",
+    collect=_webhook_oldest_pending,
+)
+CACHE_LOOKUPS = Counter(
+    "linkscrapper_cache_lookups_total",
+    "Lookups in in-process caches by cache name and result (hit/miss)",
+    ("cache", "result"),
+)
+WEBSOCKET_SUBSCRIBERS = Gauge(
+    "linkscrapper_websocket_subscribers",
+    "Open /ws/status connections",
+)
+FETCH_CONNECTIONS = Gauge(
+    "linkscrapper_fetch_connections",
+    "Open connections in the shared fetch client pool by protocol",
+    ("protocol",),
+    collect=_fetch_connections,
+)
@@ -0,0 +1,103 @@
+"""
+Sampled profiling of analysis jobs.
+
+When LINKSCRAPPER_PROFILE_THRESHOLD_SECONDS is set, a LINKSCRAPPER_PROFILE_SAMPLE_RATE
+fraction of jobs run under a profiler; jobs that end up slower than the threshold
+have their profile written to LINKSCRAPPER_PROFILE_DIR as:
+
+- <analysis_id>.html with pyinstrument installed. Its async mode follows
+  the job's own task across awaits, so this is a per-job profile.
+- <analysis_id>.thread.pstats otherwise. cProfile records everything the
+  event loop thread ran while the job was in flight, including other jobs
+  and request handlers, so read it as a thread-wide profile of that
+  window rather than the job's own cost.
+
+Only one job is profiled at a time: profilers hook the whole thread, so
+overlapping sessions would just record each other.
+"""
+from __future__ import annotations
+
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+_threshold_env = os.getenv("LINKSCRAPPER_PROFILE_THRESHOLD_SECONDS")
+PROFILE_THRESHOLD_SECONDS: Optional[float] = float(_threshold_env) if _threshold_env else None
+PROFILE_SAMPLE_RATE = float(os.getenv("LINKSCRAPPER_PROFILE_SAMPLE_RATE", "0.1"))
+PROFILE_DIR = os.getenv("LINKSCRAPPER_PROFILE_DIR", "profiles")
+
+_active = False
+
+
+class _PyinstrumentSession:
+    suffix = ".html"
+
+    def __init__(self):
+        from pyinstrument import Profiler
+
+        self._profiler = Profiler(async_mode="enabled")
+
+    def start(self) -> None:
+        self._profiler.start()
+
+    def stop(self) -> None:
+        self._profiler.stop()
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self._profiler.output_html())
+
+
+class _CProfileSession:
+    suffix = ".thread.pstats"  # thread-wide, see module docstring
+
+    def __init__(self):
+        import cProfile
+
+        self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        self._profiler.enable()
+
+    def stop(self) -> None:
+        self._profiler.disable()
+
+    def dump(self, path: str) -> None:
+        self._profiler.dump_stats(path)
+
+
+def _new_session():
+    try:
+        return _PyinstrumentSession()
+    except ImportError:
+        return _CProfileSession()
+
+
+@contextmanager
+def maybe_profile(analysis_id: str) -> Iterator[None]:
+    """
+    Wrap one job. Cheap no-op unless profiling is configured and this job is sampled.
+    """
+    global _active
+    if (
+        PROFILE_THRESHOLD_SECONDS is None
+        or _active
+        or random.random() >= PROFILE_SAMPLE_RATE
+    ):
+        yield
+        return
+
+    _active = True
+    session = _new_session()
+    t0 = time.perf_counter()
+    session.start()
+    try:
+        yield
+    finally:
+        session.stop()
+        _active = False
+        if time.perf_counter() - t0 >= PROFILE_THRESHOLD_SECONDS:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            session.dump(os.path.join(PROFILE_DIR, f"{analysis_id}{session.suffix}"))
@@ -0,0 +1,153 @@
+"""
+On-disk index of known-malicious hosts and URLs (built from URLhaus by
+scripts/build_reputation_index.py).
+
+File layout (little endian):
+    magic  b"LSREP001"
+    u64    host table slots, u64 url table slots
+    u64[]  host table, u64[] url table
+
+Each table is an open-addressing hash table of 64-bit blake2b hashes
+(0 marks an empty slot), sized to a power of two at <= 50% load, so a lookup
+is one hash plus a couple of probes. The file is memory-mapped read-only:
+worker processes share the same pages through the OS page cache.
+"""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+from backend.app.utils.urls import normalize_url
+
+MAGIC = b"LSREP001"
+_HEADER = struct.Struct("<8sQQ")
+_SLOT = struct.Struct("<Q")
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parents[1] / "data" / "processed" / "reputation.idx"
+INDEX_PATH = Path(os.getenv("LINKSCRAPPER_REPUTATION_INDEX", str(DEFAULT_INDEX_PATH)))
+# How often lookups check whether the index file was rebuilt
+RELOAD_CHECK_SECONDS = 5.0
+
+
+def _hash(key: str) -> int:
+    h = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return h or 1  # 0 is reserved for empty slots
+
+
+def _table_size(n: int) -> int:
+    size = 8
+    while size < 2 * n:
+        size *= 2
+    return size
+
+
+def _build_table(keys: Iterable[str]) -> list:
+    hashes = {_hash(k) for k in keys}
+    size = _table_size(len(hashes))
+    mask = size - 1
+    table = [0] * size
+    for h in hashes:
+        i = h & mask
+        while table[i]:
+            i = (i + 1) & mask
+        table[i] = h
+    return table
+
+
+def write_index(path: Path, hosts: Iterable[str], urls: Iterable[str]) -> Tuple[int, int]:
+    """
+    Write a new index atomically (temp file + rename), so running readers
+    keep their old mapping and pick up the new file on the next reload check.
+    """
+    host_table = _build_table(h.lower().rstrip(".") for h in hosts)
+    url_table = _build_table(normalize_url(u) for u in urls)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(host_table), len(url_table)))
+        f.write(struct.pack(f"<{len(host_table)}Q", *host_table))
+        f.write(struct.pack(f"<{len(url_table)}Q", *url_table))
+    os.replace(tmp, path)
+    return sum(1 for h in host_table if h), sum(1 for h in url_table if h)
+
+
+class ReputationIndex:
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._host_slots, self._url_slots = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"Not a reputation index: {path}")
+        self._host_off = _HEADER.size
+        self._url_off = self._host_off + self._host_slots * _SLOT.size
+
+    def _contains(self, offset: int, slots: int, h: int) -> bool:
+        mask = slots - 1
+        i = h & mask
+        while True:
+            (v,) = _SLOT.unpack_from(self._mm, offset + i * _SLOT.size)
+            if v == h:
+                return True
+            if v == 0:
+                return False
+            i = (i + 1) & mask
+
+    def contains_host(self, host: str) -> bool:
+        return self._contains(self._host_off, self._host_slots, _hash(host.lower().rstrip(".")))
+
+    def contains_url(self, url: str) -> bool:
+        return self._contains(self._url_off, self._url_slots, _hash(normalize_url(url)))
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+_index: Optional[ReputationIndex] = None
+_index_mtime: Optional[float] = None
+_next_check = 0.0
+_lock = threading.Lock()
+
+
+def get_index() -> Optional[ReputationIndex]:
+    """
+    Current index, reopened when the file on disk changes. None if no index
+    has been built (lookups then report no hits).
+    """
+    global _index, _index_mtime, _next_check
+    now = time.monotonic()
+    if now < _next_check:
+        return _index
+
+    with _lock:
+        _next_check = now + RELOAD_CHECK_SECONDS
+        try:
+            mtime = INDEX_PATH.stat().st_mtime
+        except FileNotFoundError:
+            _index, _index_mtime = None, None
+            return None
+        if mtime != _index_mtime:
+            # The old mapping is left to the GC: a lookup may still be using it
+            _index = ReputationIndex(INDEX_PATH)
+            _index_mtime = mtime
+    return _index
+
+
+def lookup(url: str) -> Tuple[bool, bool]:
+    """
+    (url_listed, host_listed) for one URL.
+    """
+    index = get_index()
+    if index is None:
+        return False, False
+    host = urlparse(url).hostname or ""
+    return index.contains_url(url), bool(host) and index.contains_host(host)
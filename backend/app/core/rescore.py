@@ -0,0 +1,204 @@
+"""
+Re-score stored analyses without refetching.
+
+Signals are rebuilt from what the stored payload kept (redirect chain, status,
+content type, headers, page signals); features and risk are recomputed with
+the current code and written back in one transaction per batch.
+
+Rows are walked in primary-key order, and the last committed ID is written to a
+checkpoint file after every batch, so an interrupted run resumes where it
+stopped.
+"""
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.app.core.features import signals_to_features
+from backend.app.core.fetcher import ALLOWED_RESPONSE_HEADERS, FetchResult
+from backend.app.core.html_inspect import PageSignals
+from backend.app.core.scoring import assess_risk
+from backend.app.core.serialization import dump_result, load_blob
+from backend.app.core.signals import extract_signals
+
+# Rows written before headers/page were stored: recover them from the features
+_HEADER_FEATURES = {
+    "strict-transport-security": "hdr_hsts",
+    "content-security-policy": "hdr_csp",
+    "x-frame-options": "hdr_xfo",
+    "x-content-type-options": "hdr_xcto",
+    "referrer-policy": "hdr_referrer_policy",
+    "permissions-policy": "hdr_permissions_policy",
+}
+DEFAULT_CHECKPOINT_PATH = "rescore.checkpoint"
+
+_PAGE_FIELDS = ("has_password_field", "external_form_action", "has_meta_refresh", "has_script_redirect")
+
+
+@dataclass
+class RescoreProgress:
+    running: bool = False
+    processed: int = 0
+    updated: int = 0
+    skipped: int = 0
+    last_id: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+
+def fetch_result_from_payload(payload: Dict[str, Any]) -> Optional[FetchResult]:
+    chain = payload.get("redirect_chain") or []
+    status = payload.get("http_status")
+    if not chain or status is None:
+        return None  # never fetched (e.g. allowlisted)
+
+    old_features = payload.get("features") or {}
+
+    headers = payload.get("headers")
+    if headers is None:
+        headers = {h: "" for h, feat in _HEADER_FEATURES.items() if old_features.get(feat)}
+    headers = {k: v for k, v in headers.items() if k in ALLOWED_RESPONSE_HEADERS}
+
+    page_data = payload.get("page")
+    if page_data is not None:
+        page = PageSignals(**page_data)
+    elif any(name in old_features for name in _PAGE_FIELDS):
+        page = PageSignals(**{name: bool(old_features.get(name)) for name in _PAGE_FIELDS})
+    else:
+        page = None
+
+    return FetchResult(
+        final_url=payload.get("final_url") or chain[-1],
+        status_code=int(status),
+        redirect_chain=chain,
+        content_type=payload.get("content_type"),
+        server=payload.get("server"),
+        headers=headers,
+        truncated=bool(payload.get("truncated", False)),
+        page=page,
+    )
+
+
+def rescore_payload(stored: bytes) -> Optional[bytes]:
+    """
+    Takes a stored result (see core/serialization.py) and returns the updated
+    one, or None if the row cannot be re-scored. Module-level and bytes in/out
+    so it can run in a process pool.
+    """
+    payload = load_blob(stored)
+    fetch = fetch_result_from_payload(payload)
+    if fetch is None:
+        return None
+
+    signals = extract_signals(fetch)
+    assessment = assess_risk(signals)
+    payload.update({
+        "message": f"Risk {assessment.risk_level} ({assessment.risk_score}/100)",
+        "risk_score": assessment.risk_score,
+        "risk_level": assessment.risk_level,
+        "reasons": assessment.reasons,
+        "features": signals_to_features(signals),
+    })
+    return dump_result(payload)
+
+
+def _read_checkpoint(path: Optional[str]) -> Optional[str]:
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    return None
+
+
+def _write_checkpoint(path: Optional[str], last_id: str) -> None:
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(last_id)
+    os.replace(tmp, path)
+
+
+def rescore_all(
+    batch_size: int = 500,
+    workers: Optional[int] = None,
+    checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT_PATH,
+    progress: Optional[RescoreProgress] = None,
+    on_batch: Optional[Callable[[RescoreProgress], None]] = None,
+) -> RescoreProgress:
+    """
+    Re-score every done row. workers=1 runs in-process (no pool).
+    """
+    import multiprocessing  # pulls in a lot; only needed here
+    from concurrent.futures import ProcessPoolExecutor
+
+    from sqlalchemy import or_, update
+
+    from backend.app.db import SessionLocal
+    from backend.app.models.db_models import Analysis
+
+    progress = progress or RescoreProgress()
+    progress.running = True
+    progress.started_at = time.time()
+    progress.last_id = _read_checkpoint(checkpoint_path)
+
+    # spawn: the API calls this from an executor thread, and forking a
+    # threaded process can copy locks held by other threads
+    pool = (
+        ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        if workers != 1
+        else None
+    )
+    db = SessionLocal()
+    try:
+        while True:
+            q = db.query(Analysis.id, Analysis.result_blob, Analysis.result_json).filter(
+                Analysis.status == "done",
+                or_(Analysis.result_blob.isnot(None), Analysis.result_json.isnot(None)),
+            )
+            if progress.last_id is not None:
+                q = q.filter(Analysis.id > progress.last_id)
+            batch: List[Tuple[str, bytes, str]] = q.order_by(Analysis.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            blobs = [bytes(b) if b is not None else j.encode("utf-8") for _, b, j in batch]
+            if pool is not None:
+                results = list(pool.map(rescore_payload, blobs, chunksize=max(1, len(blobs) // 32)))
+            else:
+                results = [rescore_payload(b) for b in blobs]
+
+            for (row_id, _, _), new_blob in zip(batch, results):
+                if new_blob is None:
+                    progress.skipped += 1
+                    continue
+                db.execute(
+                    update(Analysis)
+                    .where(Analysis.id == row_id)
+                    # new updated_at -> new ETag for HTTP caches
+                    .values(result_blob=new_blob, result_json=None, updated_at=datetime.utcnow())
+                )
+                progress.updated += 1
+            db.commit()
+
+            progress.processed += len(batch)
+            progress.last_id = batch[-1][0]
+            _write_checkpoint(checkpoint_path, progress.last_id)
+            if on_batch:
+                on_batch(progress)
+
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)  # finished: next run starts from scratch
+    except Exception as e:
+        progress.error = str(e)
+        raise
+    finally:
+        db.close()
+        if pool is not None:
+            pool.shutdown()
+        progress.running = False
+        progress.finished_at = time.time()
+    return progress
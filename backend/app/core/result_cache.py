@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+from backend.app.core.metrics import CACHE_LOOKUPS
+
+RESULT_CACHE_SIZE = int(os.getenv("LINKSCRAPPER_RESULT_CACHE_SIZE", "1024"))
+# Done rows only change when re-scored; this bounds how long a process that
+# did not run the re-score can keep serving the old result.
+RESULT_CACHE_TTL_SECONDS = float(os.getenv("LINKSCRAPPER_RESULT_CACHE_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    blob: bytes  # stored bytes, see core/serialization.py
+    compressed: bool
+    updated_at: datetime
+    etag: str
+    last_modified: str
+
+
+class ResultCache:
+    """
+    Thread-safe LRU of completed results keyed by analysis ID, so polling a
+    finished analysis does not hit the database.
+    """
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, ttl_seconds: float = RESULT_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, CachedResult]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, analysis_id: str) -> Optional[CachedResult]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(analysis_id)
+            if entry is not None and entry[0] <= now:
+                del self._entries[analysis_id]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(analysis_id)
+        CACHE_LOOKUPS.inc(cache="results", result="hit" if entry else "miss")
+        return entry[1] if entry else None
+
+    def put(self, analysis_id: str, result: CachedResult) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[analysis_id] = (time.monotonic() + self.ttl_seconds, result)
+            self._entries.move_to_end(analysis_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+result_cache = ResultCache()
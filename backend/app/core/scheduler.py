@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+from backend.app.core.metrics import LANE_JOB_SECONDS, LANE_QUEUE_DEPTH, QUEUE_WAIT_SECONDS
+
+# Lane name -> weight. With all lanes busy, interactive jobs get 6 of every
+# 10 free slots, bulk 3 and background re-scans 1.
+LANE_WEIGHTS: Dict[str, int] = {
+    "interactive": 6,
+    "bulk": 3,
+    "background": 1,
+}
+
+MAX_CONCURRENT_JOBS = int(os.getenv("LINKSCRAPPER_MAX_CONCURRENT_JOBS", "20"))
+
+JobFactory = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class _Lane:
+    name: str
+    weight: int
+    queue: Deque[Tuple[float, JobFactory]] = field(default_factory=deque)
+    # Stride scheduling: the lane with the smallest pass runs next and
+    # advances by 1/weight, so heavier lanes are picked proportionally more.
+    pass_value: float = 0.0
+
+
+class JobScheduler:
+    """
+    Runs analysis jobs with a global concurrency limit shared between lanes
+    by weighted fair queuing. An idle lane does not bank credit: when it gets
+    work again it starts level with the lanes that are already busy.
+    """
+
+    def __init__(self, limit: int = MAX_CONCURRENT_JOBS, weights: Optional[Dict[str, int]] = None):
+        self._lanes = {
+            name: _Lane(name, w) for name, w in (weights or LANE_WEIGHTS).items()
+        }
+        self._limit = max(1, limit)
+        self._running: Set[asyncio.Task] = set()
+        self._vtime = 0.0  # pass value of the most recently dispatched job
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    @limit.setter
+    def limit(self, value: int) -> None:
+        self._limit = max(1, value)
+        self._dispatch()
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def queued(self, lane: str) -> int:
+        return len(self._lanes[lane].queue)
+
+    def submit(self, lane: str, job: JobFactory) -> None:
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown lane: {lane}")
+        target = self._lanes[lane]
+        if not target.queue:
+            target.pass_value = max(target.pass_value, self._vtime)
+        target.queue.append((time.monotonic(), job))
+        LANE_QUEUE_DEPTH.set(len(target.queue), lane=lane)
+        self._dispatch()
+
+    async def cancel_all(self) -> None:
+        """
+        Drop queued jobs and cancel running ones; returns once they have stopped.
+        """
+        for lane in self._lanes.values():
+            lane.queue.clear()
+            LANE_QUEUE_DEPTH.set(0, lane=lane.name)
+        tasks = list(self._running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _next_lane(self) -> Optional[_Lane]:
+        return min(
+            (l for l in self._lanes.values() if l.queue),
+            key=lambda l: l.pass_value,
+            default=None,
+        )
+
+    def _dispatch(self) -> None:
+        while len(self._running) < self._limit:
+            lane = self._next_lane()
+            if lane is None:
+                return
+            enqueued_at, job = lane.queue.popleft()
+            self._vtime = lane.pass_value
+            lane.pass_value += 1.0 / lane.weight
+            LANE_QUEUE_DEPTH.set(len(lane.queue), lane=lane.name)
+            QUEUE_WAIT_SECONDS.observe(time.monotonic() - enqueued_at, lane=lane.name)
+
+            task = asyncio.create_task(job())
+            self._running.add(task)
+            task.add_done_callback(
+                lambda t, lane_name=lane.name, t0=enqueued_at: self._on_done(t, lane_name, t0)
+            )
+
+    def _on_done(self, task: asyncio.Task, lane: str, enqueued_at: float) -> None:
+        self._running.discard(task)
+        LANE_JOB_SECONDS.observe(time.monotonic() - enqueued_at, lane=lane)
+        self._dispatch()
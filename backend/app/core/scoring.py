@@ -89,6 +89,39 @@ def assess_risk(signals: UrlSignals) -> RiskAssessment:
         score += 25
         reasons.append("URL contains sensitive keywords (e.g., login, verify, secure)")
 
+    # 8) Chain cut short by the time budget (slow hops are a weak signal)
+    if signals.truncated:
+        score += 5
+        reasons.append("Redirect chain truncated (time budget exceeded)")
+
+    # 9) Page content
+    if signals.has_password_field and signals.external_form_action:
+        score += 30
+        reasons.append("Password form submits to a different host")
+    elif signals.has_password_field:
+        score += 10
+        reasons.append("Page asks for a password")
+    elif signals.external_form_action:
+        score += 10
+        reasons.append("Form submits to a different host")
+
+    if signals.has_meta_refresh:
+        score += 10
+        reasons.append("Page redirects via meta refresh")
+
+    if signals.has_script_redirect:
+        score += 10
+        reasons.append("Page redirects via JavaScript")
+
+    # 10) Reputation (URLhaus). Host-level hits are weaker: shared hosting
+    # and file-sharing hosts show up there too.
+    if signals.known_malicious_url:
+        score += 60
+        reasons.append("URL is listed as malicious (URLhaus)")
+    elif signals.known_malicious_host:
+        score += 30
+        reasons.append("Host has served malicious URLs (URLhaus)")
+
     score = _clamp(score)
 
     if score >= 60:
@@ -0,0 +1,97 @@
+"""
+Encoding of stored analysis results.
+
+Results are stored as JSON bytes in Analysis.result_blob: orjson when it is
+installed (stdlib json otherwise), gzip-compressed when
+LINKSCRAPPER_COMPRESS_RESULTS=1 and the payload is big enough to benefit.
+Because the stored bytes are already JSON, API handlers can send them as
+the response body as-is (gzip included, if the client accepts it) instead of
+decoding and re-encoding.
+
+Rows written before result_blob existed still have result_json text;
+load_result/result_bytes read both.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+COMPRESS_RESULTS = os.getenv("LINKSCRAPPER_COMPRESS_RESULTS", "0") == "1"
+# Below this size gzip header overhead outweighs the savings
+COMPRESS_MIN_BYTES = 1024
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def is_compressed(blob: bytes) -> bool:
+    return blob[:2] == _GZIP_MAGIC
+
+
+def dump_result(payload: Dict[str, Any], compress: bool = COMPRESS_RESULTS) -> bytes:
+    raw = dumps(payload)
+    if compress and len(raw) >= COMPRESS_MIN_BYTES:
+        # mtime=0 keeps identical payloads byte-identical
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    return raw
+
+
+def result_bytes(row) -> Optional[Tuple[bytes, bool]]:
+    """
+    (stored bytes, gzip-compressed?) for a row, without decoding the JSON.
+    None if the row has no result.
+    """
+    if row.result_blob is not None:
+        blob = bytes(row.result_blob)
+        return blob, is_compressed(blob)
+    if row.result_json is not None:
+        return row.result_json.encode("utf-8"), False
+    return None
+
+
+def load_blob(blob: bytes) -> Dict[str, Any]:
+    return loads(gzip.decompress(blob) if is_compressed(blob) else blob)
+
+
+def load_result(row) -> Optional[Dict[str, Any]]:
+    stored = result_bytes(row)
+    return load_blob(stored[0]) if stored is not None else None
+
+
+def json_bytes(row) -> Optional[bytes]:
+    """
+    Uncompressed JSON bytes of the stored result.
+    """
+    stored = result_bytes(row)
+    if stored is None:
+        return None
+    blob, compressed = stored
+    return gzip.decompress(blob) if compressed else blob
+
+
+def embed_raw(data: Dict[str, Any], key: str, raw_json: bytes) -> bytes:
+    """
+    Serialize `data` with `raw_json` (already-encoded JSON) added under `key`,
+    without parsing it.
+    """
+    head = dumps(data)
+    sep = b"," if len(head) > 2 else b""
+    return head[:-1] + sep + dumps(key) + b":" + raw_json + b"}"
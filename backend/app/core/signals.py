@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+from backend.app.core import reputation
 from backend.app.core.fetcher import FetchResult
+from backend.app.core.html_inspect import PageSignals
 
 
 from dataclasses import dataclass
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from urllib.parse import urlparse
 
 KNOWN_SHORTENERS = {
@@ -44,6 +46,18 @@ class UrlSignals:
     is_https: bool
     has_sensitive_keywords: bool
 
+    # Fetch ran out of time budget before reaching the end of the chain
+    truncated: bool = False
+
+    # Content signals from the final HTML page (False when not inspected)
+    has_password_field: bool = False
+    external_form_action: bool = False
+    has_meta_refresh: bool = False
+    has_script_redirect: bool = False
+
+    # Any hop listed in the URLhaus reputation index
+    known_malicious_url: bool = False
+    known_malicious_host: bool = False
 
 
 def _host(url: str) -> Optional[str]:
@@ -97,6 +111,14 @@ def _uses_shortener(chain: List[str]) -> bool:
             return True
     return False
 
+def _reputation_hits(urls: List[str]) -> Tuple[bool, bool]:
+    url_hit = host_hit = False
+    for u in urls:
+        u_hit, h_hit = reputation.lookup(u)
+        url_hit = url_hit or u_hit
+        host_hit = host_hit or h_hit
+    return url_hit, host_hit
+
 def extract_signals(fetch: FetchResult) -> UrlSignals:
     """
     Convert FetchResult (what happened) into UrlSignals (measurable features).
@@ -107,6 +129,8 @@ def extract_signals(fetch: FetchResult) -> UrlSignals:
 
     initial_host = _host(initial_url) if initial_url else None
     final_host = _host(fetch.final_url) if fetch.final_url else None
+    page = fetch.page or PageSignals()
+    listed_url, listed_host = _reputation_hits(chain or [fetch.final_url])
 
     return UrlSignals(
         redirect_count=len(chain) - 1 if len(chain) > 0 else 0,
@@ -135,7 +159,14 @@ def extract_signals(fetch: FetchResult) -> UrlSignals:
         path_length=len(urlparse(fetch.final_url).path),
         dot_count_host=final_host.count(".") if final_host else 0,
         is_https=fetch.final_url.startswith("https://"),
-        has_sensitive_keywords=any(k in fetch.final_url.lower() for k in ["login", "verify", "secure", "account", "update", "banking", "signin"])
+        has_sensitive_keywords=any(k in fetch.final_url.lower() for k in ["login", "verify", "secure", "account", "update", "banking", "signin"]),
+        truncated=fetch.truncated,
+        has_password_field=page.has_password_field,
+        external_form_action=page.external_form_action,
+        has_meta_refresh=page.has_meta_refresh,
+        has_script_redirect=page.has_script_redirect,
+        known_malicious_url=listed_url,
+        known_malicious_host=listed_host,
     )
 
 
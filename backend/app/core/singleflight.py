@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls with the same key: the first caller starts the
+    work, later callers await the same task and get the same result (or error).
+
+    The shared task is shielded, so cancelling one waiter does not cancel the
+    work the others are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Returns (result, shared) where shared is True if this call attached to
+        an already running task.
+        """
+        task = self._inflight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Retrieve the exception so a failed task nobody awaited is not logged
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,186 @@
+"""
+Optional tracing spans around the analysis pipeline.
+
+LINKSCRAPPER_TRACING selects the backend:
+- unset / "off": span() is a no-op (default, no overhead beyond one check)
+- "file": spans are appended as JSON lines to LINKSCRAPPER_TRACE_FILE, using
+  OpenTelemetry field names (traceId, spanId, parentSpanId, ...) so the file
+  can be replayed into a collector
+- "otel": spans go through the opentelemetry API; exporter/collector setup is
+  left to the OTel SDK environment (e.g. `opentelemetry-instrument`)
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import secrets
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from backend.app.utils.background_writer import BackgroundAppender
+
+TRACING_MODE = os.getenv("LINKSCRAPPER_TRACING", "off").lower()
+TRACE_FILE = os.getenv("LINKSCRAPPER_TRACE_FILE", "traces.jsonl")
+
+# (trace_id, span_id) of the innermost open span in this task
+_current: ContextVar[Optional[Tuple[str, str]]] = ContextVar("linkscrapper_span", default=None)
+_otel_tracer = None
+
+if TRACING_MODE == "otel":
+    try:
+        from opentelemetry import trace as _otel_trace
+
+        _otel_tracer = _otel_trace.get_tracer("linkscrapper")
+    except ImportError:
+        TRACING_MODE = "off"
+
+
+def _encode_span(record: Dict[str, Any]) -> bytes:
+    return (json.dumps(record, default=str) + "\n").encode("utf-8")
+
+
+# Spans (one per SQL statement, too) are written off the event loop
+_writer: Optional[BackgroundAppender] = (
+    BackgroundAppender(TRACE_FILE, _encode_span, name="trace-writer") if TRACING_MODE == "file" else None
+)
+if _writer is not None:
+    atexit.register(_writer.close)
+
+
+def enabled() -> bool:
+    return TRACING_MODE in ("file", "otel")
+
+
+def close() -> None:
+    """
+    Write out queued file spans (API lifespan / worker shutdown).
+    """
+    if _writer is not None:
+        _writer.close()
+
+
+def _write_span(record: Dict[str, Any]) -> None:
+    _writer.put(record)
+
+
+def record_span(name: str, start_ns: int, end_ns: int, **attributes: Any) -> None:
+    """
+    Record an already-finished span under the current parent (used for
+    callbacks such as SQLAlchemy events that cannot wrap a `with` block).
+    """
+    if TRACING_MODE == "file":
+        parent = _current.get()
+        _write_span({
+            "traceId": parent[0] if parent else secrets.token_hex(16),
+            "spanId": secrets.token_hex(8),
+            "parentSpanId": parent[1] if parent else None,
+            "name": name,
+            "startTimeUnixNano": start_ns,
+            "endTimeUnixNano": end_ns,
+            "attributes": attributes,
+        })
+    elif TRACING_MODE == "otel":
+        s = _otel_tracer.start_span(name, start_time=start_ns, attributes=attributes)
+        s.end(end_time=end_ns)
+
+
+@contextmanager
+def _file_span(name: str, attributes: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    parent = _current.get()
+    trace_id = parent[0] if parent else secrets.token_hex(16)
+    span_id = secrets.token_hex(8)
+    token = _current.set((trace_id, span_id))
+    start = time.time_ns()
+    status = "OK"
+    try:
+        yield attributes
+    except BaseException as e:
+        status = "ERROR"
+        attributes["exception"] = repr(e)
+        raise
+    finally:
+        _current.reset(token)
+        _write_span({
+            "traceId": trace_id,
+            "spanId": span_id,
+            "parentSpanId": parent[1] if parent else None,
+            "name": name,
+            "startTimeUnixNano": start,
+            "endTimeUnixNano": time.time_ns(),
+            "status": status,
+            "attributes": attributes,
+        })
+
+
+@contextmanager
+def _otel_span(name: str, attributes: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    with _otel_tracer.start_as_current_span(name) as s:
+        try:
+            yield attributes
+        finally:
+            for k, v in attributes.items():
+                s.set_attribute(k, v if isinstance(v, (str, bool, int, float)) else str(v))
+
+
+def span(name: str, **attributes: Any):
+    """
+    Context manager for one span. Yields a dict; keys added to it inside the
+    block become span attributes.
+    """
+    if TRACING_MODE == "file":
+        return _file_span(name, attributes)
+    if TRACING_MODE == "otel":
+        return _otel_span(name, attributes)
+    return nullcontext(attributes)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Emit a db.<verb> span for every statement executed on the engine.
+    """
+    if not enabled():
+        return
+
+    from sqlalchemy import event
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._trace_start_ns = time.time_ns()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(" ", 1)[0].lower()
+        record_span(
+            f"db.{verb}",
+            context._trace_start_ns,
+            time.time_ns(),
+            statement=statement[:200],
+        )
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+
+
+def httpx_trace_hook():
+    """
+    httpx `trace` extension callback that turns connection setup into spans.
+    connect_tcp includes name resolution, so it is reported as "dns+connect".
+    Returns None when tracing is off so requests skip the extension entirely.
+    """
+    if not enabled():
+        return None
+
+    started: Dict[str, int] = {}
+    names = {"connection.connect_tcp": "fetch.dns+connect", "connection.start_tls": "fetch.tls"}
+
+    async def hook(event_name: str, info: Dict[str, Any]) -> None:
+        prefix, _, phase = event_name.rpartition(".")
+        if prefix not in names:
+            return
+        if phase == "started":
+            started[prefix] = time.time_ns()
+        elif phase in ("complete", "failed") and prefix in started:
+            record_span(names[prefix], started.pop(prefix), time.time_ns(), outcome=phase)
+
+    return hook
@@ -0,0 +1,374 @@
+"""
+Callback delivery of finished analyses.
+
+When a job with a callback_url finishes (or the job queue gives up on it),
+an outbox row is written in the same transaction as the result (enqueue). A WebhookDispatcher, running in
+the API process and in every worker process, then:
+
+- claims due outbox rows (lease + compare-and-set, like core/jobqueue.py,
+  so any number of processes can share the outbox). A claim takes at most
+  one batch per destination and few enough destinations to be delivered
+  well inside the lock, and every status write is fenced on the claim
+  (locked_by, locked_until), so a process whose lock ran out cannot
+  overwrite the outcome recorded by the one that re-claimed the row;
+- groups them by callback URL and POSTs up to MAX_BATCH results per request
+  as {"results": [...]}, using the stored result bytes as-is;
+- sends through one pooled client per process, so repeated deliveries to
+  the same destination reuse keep-alive connections;
+- on a network error, 408/429 or 5xx, schedules a retry with exponential
+  backoff and jitter. Other 4xx responses, or MAX_ATTEMPTS failures, mark
+  the row "failed".
+
+If LINKSCRAPPER_WEBHOOK_SECRET is set, each request carries
+X-LinkScrapper-Signature: sha256=<HMAC of the body>.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import logging
+import os
+import random
+import socket
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import groupby
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+import httpx
+from sqlalchemy import and_, func, or_, select, update
+
+from backend.app.core.fetcher import HTTP2_ENABLED, _is_private_host
+from backend.app.core.metrics import WEBHOOK_DELIVERIES, WEBHOOK_DELIVERY_SECONDS, WEBHOOK_REQUEST_SECONDS
+from backend.app.core.serialization import dumps, json_bytes
+from backend.app.db import SessionLocal
+from backend.app.models.db_models import Analysis, WebhookOutbox
+
+logger = logging.getLogger(__name__)
+
+WEBHOOKS_ENABLED = os.getenv("LINKSCRAPPER_WEBHOOKS", "1") == "1"
+WEBHOOK_SECRET = os.getenv("LINKSCRAPPER_WEBHOOK_SECRET")
+MAX_BATCH = int(os.getenv("LINKSCRAPPER_WEBHOOK_MAX_BATCH", "50"))
+MAX_ATTEMPTS = int(os.getenv("LINKSCRAPPER_WEBHOOK_MAX_ATTEMPTS", "8"))
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 600.0
+REQUEST_TIMEOUT_SECONDS = 10.0
+POLL_INTERVAL_SECONDS = 0.5
+IDLE_POLL_MAX_SECONDS = 5.0  # poll interval grows to this while the outbox is empty
+LOCK_SECONDS = 60.0
+CLAIM_LIMIT = 500
+MAX_CONCURRENT_DESTINATIONS = 10
+# Worst case every POST times out: rounds of MAX_CONCURRENT_DESTINATIONS
+# requests must fit in half the lock (DNS and DB time get the rest)
+MAX_DESTINATIONS_PER_CLAIM = MAX_CONCURRENT_DESTINATIONS * max(1, int(LOCK_SECONDS / 2 // REQUEST_TIMEOUT_SECONDS))
+
+_RETRYABLE_STATUS = {408, 425, 429}
+
+
+@dataclass(frozen=True)
+class _Entry:
+    id: int
+    analysis_id: str
+    callback_url: str
+    created_at: datetime
+    attempts: int
+    locked_until: datetime  # with the owner, identifies this claim
+
+
+def callback_url_error(url: str) -> Optional[str]:
+    """
+    Reason a callback URL is refused, or None. Same SSRF rule as fetching,
+    plus names that can only resolve inside our network. Public-looking
+    names are checked again against their addresses at delivery time.
+    """
+    host = (urlparse(url).hostname or "").rstrip(".")
+    if not host or _is_private_host(host):
+        return "callback_url must not point to a private/internal IP host"
+    if host == "localhost" or host.endswith(".localhost") or "." not in host:
+        return "callback_url must use a public host name"
+    return None
+
+
+async def _private_address(host: str) -> Optional[str]:
+    """
+    First private/loopback/link-local address `host` resolves to, or None.
+    Raises OSError if it does not resolve.
+    """
+    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    for *_, sockaddr in infos:
+        addr = sockaddr[0].split("%", 1)[0]  # IPv6 scope id
+        ip = ipaddress.ip_address(addr)
+        if getattr(ip, "ipv4_mapped", None):
+            addr = str(ip.ipv4_mapped)
+        if _is_private_host(addr):
+            return addr
+    return None
+
+
+def enqueue(db, row: Analysis) -> None:
+    """
+    Add the callback for a finished row to the session; committed together
+    with the row's final status.
+    """
+    if row.callback_url:
+        db.add(WebhookOutbox(analysis_id=row.id, callback_url=row.callback_url))
+
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+    return delay * random.uniform(0.5, 1.0)  # jitter: failed destinations do not retry in lockstep
+
+
+def _due(now: datetime):
+    return and_(
+        WebhookOutbox.status == "pending",
+        WebhookOutbox.next_attempt_at <= now,
+        or_(WebhookOutbox.locked_until.is_(None), WebhookOutbox.locked_until < now),
+    )
+
+
+def _deliverable(candidates) -> List[int]:
+    """
+    Ids from (id, callback_url) candidates, keeping one batch per
+    destination and at most MAX_DESTINATIONS_PER_CLAIM destinations.
+    """
+    per_url: Dict[str, int] = {}
+    ids: List[int] = []
+    for outbox_id, url in candidates:
+        n = per_url.get(url, 0)
+        if n >= MAX_BATCH or (n == 0 and len(per_url) >= MAX_DESTINATIONS_PER_CLAIM):
+            continue
+        per_url[url] = n + 1
+        ids.append(outbox_id)
+    return ids
+
+
+def claim_due(owner: str, limit: int = CLAIM_LIMIT) -> List[_Entry]:
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        candidates = db.execute(
+            select(WebhookOutbox.id, WebhookOutbox.callback_url)
+            .where(_due(now))
+            .order_by(WebhookOutbox.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)  # not rendered on SQLite
+        ).all()
+        ids = _deliverable(candidates)
+        if not ids:
+            return []
+        locked_until = now + timedelta(seconds=LOCK_SECONDS)
+        db.execute(
+            update(WebhookOutbox)
+            .where(WebhookOutbox.id.in_(ids), _due(now))
+            .values(locked_by=owner, locked_until=locked_until)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        rows = db.query(WebhookOutbox).filter(
+            WebhookOutbox.locked_by == owner,
+            WebhookOutbox.locked_until == locked_until,
+            WebhookOutbox.status == "pending",
+        ).order_by(WebhookOutbox.callback_url, WebhookOutbox.id).all()
+        return [_Entry(r.id, r.analysis_id, r.callback_url, r.created_at, r.attempts, locked_until) for r in rows]
+    finally:
+        db.close()
+
+
+def _load_bodies(analysis_ids: List[str]) -> Dict[str, bytes]:
+    """
+    JSON for each result: the stored result bytes for done rows, a status
+    object for errors.
+    """
+    db = SessionLocal()
+    try:
+        bodies: Dict[str, bytes] = {}
+        for row in db.query(Analysis).filter(Analysis.id.in_(set(analysis_ids))):
+            raw = json_bytes(row) if row.status == "done" else None
+            bodies[row.id] = raw if raw is not None else dumps({
+                "analysis_id": row.id,
+                "url": row.input_url,
+                "status": row.status,
+                "error": row.error,
+            })
+        return bodies
+    finally:
+        db.close()
+
+
+def _finish(owner: str, entries: List[_Entry], outcome: str, error: Optional[str]) -> None:
+    """
+    Record the outcome of a delivery attempt. Rows whose claim is no longer
+    ours (lock ran out and another process re-claimed them) are left alone.
+    """
+    now = datetime.utcnow()
+    finished: List[_Entry] = []
+    db = SessionLocal()
+    try:
+        for e in entries:
+            ours = (
+                WebhookOutbox.id == e.id,
+                WebhookOutbox.locked_by == owner,
+                WebhookOutbox.locked_until == e.locked_until,
+            )
+            attempts = e.attempts + 1
+            give_up = outcome == "failed" or attempts >= MAX_ATTEMPTS
+            if outcome == "delivered":
+                values = dict(status="delivered", delivered_at=now, last_error=None)
+            else:
+                values = dict(
+                    status="failed" if give_up else "pending",
+                    last_error=error,
+                    next_attempt_at=now + timedelta(seconds=backoff_seconds(attempts)),
+                )
+            result = db.execute(
+                update(WebhookOutbox)
+                .where(*ours)
+                .values(attempts=attempts, locked_by=None, locked_until=None, **values)
+            )
+            if result.rowcount == 1:
+                finished.append(e)
+                if outcome != "delivered":
+                    WEBHOOK_DELIVERIES.inc(outcome="failed" if give_up else "retry")
+        db.commit()
+    finally:
+        db.close()
+
+    if len(finished) < len(entries):
+        logger.warning("%d webhook outbox row(s) were re-claimed before %s finished", len(entries) - len(finished), owner)
+    if outcome == "delivered" and finished:
+        WEBHOOK_DELIVERIES.inc(len(finished), outcome="delivered")
+        for e in finished:
+            WEBHOOK_DELIVERY_SECONDS.observe((now - e.created_at).total_seconds())
+
+
+def outbox_stats() -> Dict[str, float]:
+    db = SessionLocal()
+    try:
+        counts = dict(
+            db.query(WebhookOutbox.status, func.count(WebhookOutbox.id))
+            .filter(WebhookOutbox.status.in_(("pending", "failed")))
+            .group_by(WebhookOutbox.status)
+            .all()
+        )
+        oldest = db.query(func.min(WebhookOutbox.created_at)).filter(WebhookOutbox.status == "pending").scalar()
+    finally:
+        db.close()
+    return {
+        "pending": float(counts.get("pending", 0)),
+        "failed": float(counts.get("failed", 0)),
+        "oldest_pending_seconds": (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+class WebhookDispatcher:
+    def __init__(self, owner: str, client: Optional[httpx.AsyncClient] = None):
+        self.owner = owner
+        self._client = client
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_ENABLED,
+                timeout=REQUEST_TIMEOUT_SECONDS,
+                follow_redirects=False,
+                limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+                headers={"User-Agent": "LinkScrapper-Webhook/1.0"},
+            )
+        self._task = asyncio.create_task(self._run())
+
+    async def aclose(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+        if self._client is not None:
+            await self._client.aclose()
+
+    @staticmethod
+    async def _db(fn, *args):
+        # Session work is blocking; keep it off the event loop the API serves from
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _run(self) -> None:
+        idle = POLL_INTERVAL_SECONDS
+        while not self._stop.is_set():
+            try:
+                delivered_any = await self.deliver_due()
+            except Exception as e:  # keep delivering after e.g. a DB hiccup
+                logger.warning("webhook delivery pass failed: %s", e)
+                delivered_any = False
+            if delivered_any:
+                idle = POLL_INTERVAL_SECONDS
+                continue
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=idle)
+            except asyncio.TimeoutError:
+                pass
+            idle = min(IDLE_POLL_MAX_SECONDS, idle * 2)
+
+    async def deliver_due(self) -> bool:
+        entries = await self._db(claim_due, self.owner)
+        if not entries:
+            return False
+        bodies = await self._db(_load_bodies, [e.analysis_id for e in entries])
+        sem = asyncio.Semaphore(MAX_CONCURRENT_DESTINATIONS)
+
+        async def destination(url: str, group: List[_Entry]) -> None:
+            async with sem:
+                # The host may have been re-pointed since enqueue; the client
+                # resolves it again, so this narrows rather than closes the
+                # window for DNS rebinding.
+                host = urlparse(url).hostname or ""
+                try:
+                    private = await asyncio.wait_for(_private_address(host), REQUEST_TIMEOUT_SECONDS)
+                except (OSError, asyncio.TimeoutError) as e:
+                    await self._db(_finish, self.owner, group, "retry", f"DNS: {e or type(e).__name__}")
+                    return
+                if private is not None:
+                    reason = f"callback host resolves to private address {private}"
+                    await self._db(_finish, self.owner, group, "failed", reason)
+                    return
+                # Batches to one destination go out in order, one at a time
+                for i in range(0, len(group), MAX_BATCH):
+                    await self._post(url, group[i:i + MAX_BATCH], bodies)
+
+        await asyncio.gather(*(
+            destination(url, list(group))
+            for url, group in groupby(entries, key=lambda e: e.callback_url)
+        ))
+        return True
+
+    async def _post(self, url: str, batch: List[_Entry], bodies: Dict[str, bytes]) -> None:
+        missing = [e for e in batch if e.analysis_id not in bodies]
+        if missing:
+            await self._db(_finish, self.owner, missing, "failed", "analysis not found")
+            batch = [e for e in batch if e.analysis_id in bodies]
+            if not batch:
+                return
+
+        body = b'{"results":[' + b",".join(bodies[e.analysis_id] for e in batch) + b"]}"
+        headers = {"Content-Type": "application/json"}
+        if WEBHOOK_SECRET:
+            digest = hmac.new(WEBHOOK_SECRET.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            headers["X-LinkScrapper-Signature"] = f"sha256={digest}"
+
+        t0 = time.perf_counter()
+        try:
+            resp = await self._client.post(url, content=body, headers=headers)
+        except httpx.HTTPError as e:
+            outcome, error = "retry", f"{type(e).__name__}: {e}"
+        else:
+            if resp.is_success:
+                outcome, error = "delivered", None
+            elif resp.status_code >= 500 or resp.status_code in _RETRYABLE_STATUS:
+                outcome, error = "retry", f"HTTP {resp.status_code}"
+            else:
+                outcome, error = "failed", f"HTTP {resp.status_code}"
+        WEBHOOK_REQUEST_SECONDS.observe(time.perf_counter() - t0, outcome=outcome)
+        await self._db(_finish, self.owner, batch, outcome, error)
@@ -1,19 +1,86 @@
 from __future__ import annotations
 
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./linkscrapper.db"
+from backend.app.core.tracing import instrument_engine
+
+DATABASE_URL = os.getenv("LINKSCRAPPER_DATABASE_URL", "sqlite:///./linkscrapper.db")
 
 
-engine = create_engine(DATABASE_URL,
-                       connect_args={"check_same_thread": False},)
+if DATABASE_URL.startswith("sqlite"):
+    # timeout: API and worker processes share the file and wait on each other's writes
+    _engine_kwargs = {"connect_args": {"check_same_thread": False, "timeout": 30}}
+else:
+    # Postgres etc.: several API/worker hosts, connections may be dropped by proxies
+    _engine_kwargs = {"pool_pre_ping": True}
+
+engine = create_engine(DATABASE_URL, **_engine_kwargs)
+instrument_engine(engine)
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Bump when models change; startup only runs create_all when the stored
+# version differs (or is missing).
+SCHEMA_VERSION = 5
+
+
+def _stored_schema_version():
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT version FROM schema_meta")).scalar()
+    except SQLAlchemyError:
+        return None  # table missing: fresh or pre-versioning database
+
+
+def _add_missing_columns() -> None:
+    """
+    create_all only creates missing tables; add nullable columns that were
+    introduced after a table was first created.
+    """
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+
+
+def _add_missing_indexes() -> None:
+    """
+    Same for indexes declared after their table was created.
+    """
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
+
+def ensure_schema() -> None:
+    if _stored_schema_version() == SCHEMA_VERSION:
+        return
+
+    from backend.app.models import db_models  # noqa: F401  registers models
+
+    Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    _add_missing_indexes()
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_meta (version INTEGER NOT NULL)"))
+        conn.execute(text("DELETE FROM schema_meta"))
+        conn.execute(text("INSERT INTO schema_meta (version) VALUES (:v)"), {"v": SCHEMA_VERSION})
+
 def get_db():
     db = SessionLocal()
     try:
@@ -1,24 +1,55 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from backend.app.api.admin import ADMIN_TOKEN, router as admin_router
 from backend.app.api.analyze import router as analyze_router
-from backend.app.db import Base, engine, SessionLocal
+from backend.app.api.metrics import router as metrics_router
+from backend.app.core import archive, tracing, webhooks
+from backend.app.core.fetcher import close_client
+from backend.app.core.metrics import WEBSOCKET_SUBSCRIBERS
+from backend.app.core.serialization import dumps, embed_raw, json_bytes
+from backend.app.db import SessionLocal, ensure_schema
 from backend.app.models.db_models import Analysis
 from backend.app.models import db_models  # IMPORTANT: registers models
 import asyncio
-import json
+import os
+import socket
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup work lives here rather than at import time, so importing the
+    # app (tests, scripts, workers) does not touch the database.
+    ensure_schema()
+    dispatcher = None
+    if webhooks.WEBHOOKS_ENABLED:
+        dispatcher = webhooks.WebhookDispatcher(owner=f"api:{socket.gethostname()}:{os.getpid()}")
+        dispatcher.start()
+    yield
+    if dispatcher is not None:
+        await dispatcher.aclose()
+    await close_client()
+    if archive.writer is not None:
+        archive.writer.close()
+    tracing.close()
+
 
 app = FastAPI(
     title="Link Scrapper API",
     description="Backend API to analyze URLS and detect potential threats",
     version="1.0",
-
+    lifespan=lifespan,
 )
-Base.metadata.create_all(bind=engine)
 
 app.include_router(analyze_router)
+app.include_router(metrics_router)
+if ADMIN_TOKEN:
+    app.include_router(admin_router)
 
 @app.websocket("/ws/status/{analysis_id}")
 async def websocket_endpoint(websocket: WebSocket, analysis_id: str):
     await websocket.accept()
+    WEBSOCKET_SUBSCRIBERS.inc()
     try:
         while True:
             db = SessionLocal()
@@ -34,10 +65,10 @@ async def websocket_endpoint(websocket: WebSocket, analysis_id: str):
                 "message": row.progress_message
             }
             
-            if row.result_json:
-                data["result"] = json.loads(row.result_json)
-                
-            await websocket.send_json(data)
+            result = json_bytes(row)
+            # Stored result JSON is spliced in as-is rather than re-encoded
+            message = embed_raw(data, "result", result) if result is not None else dumps(data)
+            await websocket.send_text(message.decode("utf-8"))
             
             if row.status in ["done", "error"]:
                 db.close()
@@ -47,6 +78,8 @@ async def websocket_endpoint(websocket: WebSocket, analysis_id: str):
             await asyncio.sleep(1) # poll db every second
     except WebSocketDisconnect:
         pass
+    finally:
+        WEBSOCKET_SUBSCRIBERS.dec()
 
 @app.get("/")
 def root():
@@ -1,11 +1,16 @@
 from __future__ import annotations
 
 from datetime import datetime
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, LargeBinary, String, Text
 from backend.app.db import Base
 
 class Analysis(Base):
     __tablename__ = "analyses"
+    __table_args__ = (
+        # Job claims (core/jobqueue.py): queued rows by lane and age, expired leases
+        Index("ix_analyses_status_priority_created", "status", "priority", "created_at"),
+        Index("ix_analyses_status_lease", "status", "lease_expires_at"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     input_url = Column(String, nullable=False)
@@ -14,5 +19,39 @@ class Analysis(Base):
     progress_message = Column(String, nullable=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
-    result_json = Column(Text, nullable=True)
+    result_json = Column(Text, nullable=True)  # legacy rows; new results go to result_blob
+    result_blob = Column(LargeBinary, nullable=True)  # see core/serialization.py
     error = Column(Text, nullable=True)
+
+    # Job parameters, so a worker process can run the job (core/jobqueue.py)
+    priority = Column(String, nullable=True, default="interactive")
+    follow_redirects = Column(Boolean, nullable=True)
+    max_redirects = Column(Integer, nullable=True)
+    time_budget_seconds = Column(Float, nullable=True)
+    # Lease held by the process running the job; renewed by heartbeats
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=True, default=0)
+    # POSTed the result when the job finishes (core/webhooks.py)
+    callback_url = Column(String, nullable=True)
+
+
+class WebhookOutbox(Base):
+    """
+    One pending callback per finished analysis, written in the same
+    transaction as the result so a crash cannot lose it.
+    """
+    __tablename__ = "webhook_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    analysis_id = Column(String, ForeignKey("analyses.id"), nullable=False)
+    callback_url = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending", index=True)  # pending/delivered/failed
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+    # Claimed by a delivering process until this time
+    locked_by = Column(String, nullable=True)
+    locked_until = Column(DateTime, nullable=True)
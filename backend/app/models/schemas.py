@@ -1,12 +1,23 @@
 from pydantic import BaseModel, HttpUrl, Field
 from uuid import uuid4
-from typing import Optional, List
+from typing import Optional, List, Literal
 
 
 class AnalyzeRequest(BaseModel):
     url: HttpUrl
     follow_redirects: bool = True
     max_redirects: int = Field(default=10, ge=0, le=20)
+    time_budget_seconds: float = Field(default=30.0, gt=0, le=120)
+    # Scheduler lane: UI checks are "interactive", imports "bulk",
+    # periodic re-scans "background"
+    priority: Literal["interactive", "bulk", "background"] = "interactive"
+    # Finished results are POSTed here (batched per destination)
+    callback_url: Optional[HttpUrl] = None
+
+class AnalyzeBatchRequest(BaseModel):
+    items: List[AnalyzeRequest] = Field(min_length=1, max_length=1000)
+    # Used for items that do not set their own callback_url
+    callback_url: Optional[HttpUrl] = None
 
 class AnalyzeResponse(BaseModel):
     analysis_id: str
@@ -19,6 +30,8 @@ class AnalyzeResponse(BaseModel):
     redirect_chain: Optional[List[str]] = None
     content_type: Optional[str] = None
     server: Optional[str] = None
+    truncated: bool = False
+    allowlisted: bool = False
 
     risk_score: Optional[int] = None
     risk_level: Optional[str] = None
@@ -27,4 +40,9 @@ class AnalyzeResponse(BaseModel):
 class AnalyzeAccepted(BaseModel):
     analysis_id: str
     status: str
+    message: str
+
+class AnalyzeBatchAccepted(BaseModel):
+    analysis_ids: List[str]
+    status: str
     message: str
\ No newline at end of file
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import argparse
+import csv
+from pathlib import Path
+from typing import Iterable, List, Tuple
+from urllib.parse import urlparse
+
+from backend.app.core.allowlist import load_allowlist
+from backend.app.core.reputation import DEFAULT_INDEX_PATH, write_index
+
+DEFAULT_INPUT = Path(__file__).resolve().parents[1] / "data" / "raw" / "malwareurls.csv"
+# Hosts whose listed URLs are user uploads on a shared service: index the URLs only
+DEFAULT_SHARED_HOSTS = Path(__file__).resolve().parents[1] / "data" / "shared_hosts.txt"
+
+
+def iter_urlhaus_rows(path: Path, online_only: bool = False) -> Iterable[Tuple[str, str]]:
+    """
+    Yields (url, url_status) from a URLhaus CSV dump (comment lines, commented header).
+    """
+    header: List[str] = ["id", "dateadded", "url", "url_status"]
+    with path.open("r", encoding="utf-8", errors="replace", newline="") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("#"):
+                if "url" in line.lower() and "," in line:
+                    header = [h.strip().strip('"') for h in line.lstrip("#").strip().split(",")]
+                continue
+
+            row = dict(zip(header, next(csv.reader([line]))))
+            url = row.get("url", "").strip()
+            status = row.get("url_status", "")
+            if not url or (online_only and status != "online"):
+                continue
+            yield url, status
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the memory-mapped URLhaus reputation index.")
+    parser.add_argument("--input", default=str(DEFAULT_INPUT), help="URLhaus CSV dump")
+    parser.add_argument("--out", default=str(DEFAULT_INDEX_PATH), help="Index file to (re)write")
+    parser.add_argument("--online-only", action="store_true", help="Skip URLs URLhaus marks offline")
+    parser.add_argument(
+        "--shared-hosts",
+        default=str(DEFAULT_SHARED_HOSTS),
+        help="Hosts kept out of the host table (allowlist.txt format)",
+    )
+    args = parser.parse_args()
+
+    # Same exact/suffix matching as the allowlist
+    shared = load_allowlist(Path(args.shared_hosts))
+
+    urls: List[str] = []
+    hosts = set()
+    skipped_hosts = set()
+    for url, _ in iter_urlhaus_rows(Path(args.input), online_only=args.online_only):
+        host = urlparse(url).hostname
+        if not host:
+            continue
+        urls.append(url)
+        if shared.match(host):
+            skipped_hosts.add(host)
+        else:
+            hosts.add(host)
+
+    n_hosts, n_urls = write_index(Path(args.out), hosts, urls)
+    print(f"✅ Indexed {n_urls} URLs and {n_hosts} hosts -> {args.out}")
+    print(f"   {len(skipped_hosts)} shared hosts indexed by URL only")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,7 +6,7 @@ import os
 import sqlite3
 from typing import Any, Dict, Iterable, Optional
 
-from pyexpat import features
+from backend.app.core.serialization import load_blob
 
 
 def iter_done_result(db_path: str) -> Iterable[Dict[str, Any]]:
@@ -14,17 +14,17 @@ def iter_done_result(db_path: str) -> Iterable[Dict[str, Any]]:
     try:
         cur = con.cursor()
         cur.execute(  """
-            SELECT id, input_url, result_json
+            SELECT id, input_url, COALESCE(result_blob, result_json)
             FROM analyses
-            WHERE status = 'done' AND result_json IS NOT NULL
+            WHERE status = 'done' AND COALESCE(result_blob, result_json) IS NOT NULL
             """)
-        for analysis_id, input_url, result_json in cur.fetchall():
+        for analysis_id, input_url, stored in cur.fetchall():
             try:
-                payload = json.loads(result_json)
+                payload = load_blob(stored.encode("utf-8") if isinstance(stored, str) else stored)
                 payload.setdefault("url", input_url)
                 payload.setdefault("analysis_id", analysis_id)
                 yield payload
-            except json.JSONDecodeError:
+            except ValueError:  # JSONDecodeError/orjson.JSONDecodeError
                 continue
     finally:
         con.close()
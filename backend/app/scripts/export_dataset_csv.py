@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import argparse
 import csv
-import json
 import os
 import sqlite3
 from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
+from backend.app.core.serialization import load_blob
+
 
 def iter_done_payloads(db_path: str) -> Iterable[Dict[str, Any]]:
     con = sqlite3.connect(db_path)
@@ -14,18 +15,18 @@ def iter_done_payloads(db_path: str) -> Iterable[Dict[str, Any]]:
         cur = con.cursor()
         cur.execute(
             """
-            SELECT id, input_url, result_json
+            SELECT id, input_url, COALESCE(result_blob, result_json)
             FROM analyses
-            WHERE status = 'done' AND result_json IS NOT NULL
+            WHERE status = 'done' AND COALESCE(result_blob, result_json) IS NOT NULL
             """
         )
-        for analysis_id, input_url, result_json in cur.fetchall():
+        for analysis_id, input_url, stored in cur.fetchall():
             try:
-                payload = json.loads(result_json)
+                payload = load_blob(stored.encode("utf-8") if isinstance(stored, str) else stored)
                 payload.setdefault("analysis_id", analysis_id)
                 payload.setdefault("url", input_url)
                 yield payload
-            except json.JSONDecodeError:
+            except ValueError:  # JSONDecodeError/orjson.JSONDecodeError
                 continue
     finally:
         con.close()
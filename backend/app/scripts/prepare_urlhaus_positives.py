@@ -4,10 +4,11 @@ from __future__ import annotations
 import csv
 import re
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 from urllib.parse import urlparse
 
-import pandas as pd
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 INPUT_PATH = Path("/mnt/data/malwareurls.csv")  # your uploaded file
@@ -65,6 +66,8 @@ def _read_urlhaus_csv(path: Path) -> pd.DataFrame:
             "reporter",
         ]
 
+    import pandas as pd  # heavy; only needed once we actually build frames
+
     df = pd.DataFrame(rows, columns=header[: len(rows[0])])  # guard if fewer cols
     return df
 
@@ -131,6 +134,8 @@ def _url_features(url: str) -> Dict[str, float]:
 
 
 def main() -> None:
+    import pandas as pd
+
     df = _read_urlhaus_csv(INPUT_PATH)
 
     if "url" not in df.columns:
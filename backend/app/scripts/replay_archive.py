@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict
+
+from backend.app.core import fetcher
+from backend.app.core.archive import Archive, ReplayTransport
+from backend.app.core.features import signals_to_features
+from backend.app.core.scoring import assess_risk
+from backend.app.core.signals import extract_signals
+
+
+async def replay_one(analysis_id: str, url: str) -> Dict[str, Any]:
+    fetch_result = await fetcher.fetch_url(url, total_budget_seconds=None, archive_key=analysis_id)
+    signals = extract_signals(fetch_result)
+    assessment = assess_risk(signals)
+    return {
+        "analysis_id": analysis_id,
+        "url": url,
+        "final_url": fetch_result.final_url,
+        "http_status": fetch_result.status_code,
+        "redirect_chain": fetch_result.redirect_chain,
+        "risk_score": assessment.risk_score,
+        "risk_level": assessment.risk_level,
+        "reasons": assessment.reasons,
+        "features": signals_to_features(signals),
+    }
+
+
+async def run(archive_path: str, out_path: str) -> int:
+    archive = Archive(archive_path)
+    fetcher.set_client(fetcher.build_client(transport=ReplayTransport(archive)))
+
+    n_written = 0
+    with open(out_path, "w", encoding="utf-8") as f:
+        for analysis_id, hops in archive.by_key.items():
+            try:
+                row = await replay_one(analysis_id, hops[0]["url"])
+            except Exception as e:
+                row = {"analysis_id": analysis_id, "url": hops[0]["url"], "error": str(e)}
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            n_written += 1
+
+    await fetcher.close_client()
+    return n_written
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-analyze captured fetches offline from a fetch archive.")
+    parser.add_argument("--archive", required=True, help="Archive written with LINKSCRAPPER_FETCH_ARCHIVE")
+    parser.add_argument("--out", default=os.path.join("data", "replayed.jsonl"), help="Output JSONL path")
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    t0 = time.perf_counter()
+    n = asyncio.run(run(args.archive, args.out))
+    print(f"✅ Re-analyzed {n} analyses in {time.perf_counter() - t0:.2f}s -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
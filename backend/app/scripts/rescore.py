@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import argparse
+import time
+
+from backend.app.core.rescore import DEFAULT_CHECKPOINT_PATH, RescoreProgress, rescore_all
+
+
+def _print_progress(p: RescoreProgress) -> None:
+    elapsed = time.time() - (p.started_at or time.time())
+    rate = p.processed / elapsed if elapsed > 0 else 0.0
+    print(f"processed={p.processed} updated={p.updated} skipped={p.skipped} "
+          f"last_id={p.last_id} ({rate:.0f} rows/s)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-score stored analyses with the current signals/scoring code.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size (1 = no pool, default = CPU count)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT_PATH, help="Resume file (removed when the run completes)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    if args.restart:
+        import os
+        if os.path.exists(args.checkpoint):
+            os.remove(args.checkpoint)
+
+    p = rescore_all(
+        batch_size=args.batch_size,
+        workers=args.workers,
+        checkpoint_path=args.checkpoint,
+        on_batch=_print_progress,
+    )
+    print(f"✅ Re-scored {p.updated} rows ({p.skipped} skipped) in {p.finished_at - p.started_at:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
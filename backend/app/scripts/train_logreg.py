@@ -1,46 +1,363 @@
-import pandas as pd
+"""
+Train the logistic-regression risk model out of core.
+
+Labeled feature rows are streamed from one or more sources (benign exports
+from export_dataset(.py|_csv.py), URLhaus positives, ...) into a float32
+matrix on disk, which is then memory-mapped: CV workers share its pages
+through the OS page cache instead of each getting a pickled copy.
+
+The model is SGDClassifier(loss="log_loss"), fitted with partial_fit over
+mini-batches, so memory stays at one batch regardless of dataset size.
+Hyperparameters are picked by stratified k-fold CV, with every
+(params, fold) pair running in parallel (joblib), and the best setting is
+refit on all rows.
+
+Both classes must carry the same features, i.e. both come from analyses
+run by this service (signals_to_features). If one source lacks features the
+others have, the model would only learn which source a row came from, so
+training stops (or, with --intersect-features, keeps only the shared ones).
+In particular, prepare_urlhaus_positives.py writes URL-only features and
+cannot be mixed with exported analyses.
+
+Usage:
+    # benign: analyses of known-good URLs
+    python -m backend.app.scripts.export_dataset --db benign.db --out data/benign.jsonl --label 0
+    # malicious: the URLhaus URLs (data/raw/malwareurls.csv) submitted to
+    # POST /analyze/batch by an API using a separate database, then
+    python -m backend.app.scripts.export_dataset --db urlhaus.db --out data/urlhaus.jsonl --label 1
+    python -m backend.app.scripts.train_logreg \\
+        --source data/benign.jsonl --source data/urlhaus.jsonl
+
+A source is PATH[:LABEL]. JSONL rows are {"features": {...}, "label": ...}
+(or flat feature objects), CSV rows have one column per feature. LABEL
+overrides the per-row "label"; rows with neither are skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import tempfile
+import time
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+from backend.app.utils.resources import peak_rss_mb
+
+DEFAULT_MODEL_PATH = Path(__file__).resolve().parents[1] / "data" / "processed" / "risk_model.joblib"
+
+_ID_COLUMNS = {"analysis_id", "url", "label"}
+# Derived from the same URLhaus feed as the positives: they would leak the label
+DEFAULT_EXCLUDED_FEATURES = ("known_malicious_url", "known_malicious_host")
+
+
+def _parse_source(spec: str) -> Tuple[Path, Optional[int]]:
+    path, sep, label = spec.rpartition(":")
+    if sep and label in ("0", "1"):
+        return Path(path), int(label)
+    return Path(spec), None
+
+
+def iter_rows(path: Path) -> Iterator[Tuple[Dict[str, float], Optional[int]]]:
+    """
+    (features, label-or-None) per row, one line in memory at a time.
+    """
+    with path.open("r", encoding="utf-8", newline="") as f:
+        if path.suffix == ".csv":
+            for rec in csv.DictReader(f):
+                label = rec.get("label")
+                feats = {k: float(v or 0) for k, v in rec.items() if k not in _ID_COLUMNS}
+                yield feats, int(label) if label not in (None, "") else None
+            return
+
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            feats = rec.get("features")
+            if not isinstance(feats, dict):
+                feats = {k: v for k, v in rec.items() if k not in _ID_COLUMNS}
+            label = rec.get("label")
+            yield {k: float(v) for k, v in feats.items()}, int(label) if label is not None else None
+
+
+def scan_sources(
+    sources: Sequence[Tuple[Path, Optional[int]]],
+    excluded: Set[str],
+) -> Tuple[List[Set[str]], int]:
+    """
+    First pass: feature names seen in each source and number of labeled rows.
+    """
+    per_source: List[Set[str]] = []
+    n = 0
+    for path, label in sources:
+        names: Set[str] = set()
+        for feats, row_label in iter_rows(path):
+            if label is None and row_label is None:
+                continue
+            names.update(feats)
+            n += 1
+        per_source.append(names - excluded)
+    return per_source, n
+
+
+def feature_schema(
+    sources: Sequence[Tuple[Path, Optional[int]]],
+    per_source: Sequence[Set[str]],
+    intersect: bool,
+) -> List[str]:
+    """
+    Features to train on: those every source has. A source missing
+    features that others have is an error unless `intersect` is set.
+    """
+    shared = set.intersection(*per_source) if per_source else set()
+    missing = [
+        (path, sorted(set.union(*per_source) - names))
+        for (path, _), names in zip(sources, per_source)
+    ]
+    missing = [(path, names) for path, names in missing if names]
+    if missing:
+        lines = [f"  {path}: missing {len(names)} ({', '.join(names[:8])}{', ...' if len(names) > 8 else ''})"
+                 for path, names in missing]
+        msg = "Sources do not share a feature schema; the model would learn the source, not the label:\n"
+        msg += "\n".join(lines)
+        if not intersect:
+            raise SystemExit(msg + "\nExport every source with export_dataset(_csv), or pass --intersect-features.")
+        print("WARNING: " + msg + f"\nTraining on the {len(shared)} features all sources have.")
+    if not shared:
+        raise SystemExit("No feature is present in every source.")
+    return sorted(shared)
+
+
+def build_matrix(
+    sources: Sequence[Tuple[Path, Optional[int]]],
+    features: List[str],
+    workdir: Path,
+    chunk_size: int,
+) -> Tuple[Path, Path, int]:
+    """
+    Second pass: write rows to X.f32 (row-major float32) and y.i8 chunk by
+    chunk. Features a row lacks (sparse JSONL rows) are 0.
+    """
+    import numpy as np
+
+    x_path, y_path = workdir / "X.f32", workdir / "y.i8"
+    n = 0
+    with x_path.open("wb") as xf, y_path.open("wb") as yf:
+        rows = (
+            (feats, label if label is not None else row_label)
+            for path, label in sources
+            for feats, row_label in iter_rows(path)
+        )
+        labeled = ((feats, label) for feats, label in rows if label is not None)
+        while True:
+            chunk = list(itertools.islice(labeled, chunk_size))
+            if not chunk:
+                break
+            X = np.array([[feats.get(k, 0.0) for k in features] for feats, _ in chunk], dtype=np.float32)
+            y = np.array([label for _, label in chunk], dtype=np.int8)
+            X.tofile(xf)
+            y.tofile(yf)
+            n += len(chunk)
+    return x_path, y_path, n
 
-from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report
 
+def open_matrix(x_path: Path, y_path: Path, n: int, d: int):
+    import numpy as np
 
-def main():
-    ROOT = Path(__file__).resolve().parents[3]
-    DATASET_PATH = ROOT / "data" / "dataset.csv"
+    X = np.memmap(x_path, dtype=np.float32, mode="r", shape=(n, d))
+    y = np.memmap(y_path, dtype=np.int8, mode="r", shape=(n,))
+    return X, y
 
-    df = pd.read_csv(DATASET_PATH)
 
-    df["label"] = ((df["used_shortener"] == 1) | (df["redirect_count"] >= 2)).astype(int)
+def _batches(idx, chunk_size: int):
+    for start in range(0, len(idx), chunk_size):
+        yield idx[start:start + chunk_size]
 
-    X = df.drop(columns=["analysis_id", "url", "label"])
-    y = df["label"]
 
-    n = len(df)
-    if n < 5:
-        raise ValueError(
-            f"Need at least 5 samples to train/test split; got {n}. Run more /analyze and re-export dataset.csv")
+def fit_streaming(X, y, idx, alpha: float, penalty: str, epochs: int, chunk_size: int, seed: int):
+    """
+    Fit scaler + SGD logistic regression on rows `idx` one mini-batch at a
+    time. Classes are weighted inversely to their frequency.
+    """
+    import numpy as np
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.preprocessing import StandardScaler
 
-    # If all labels are identical, stratify will fail and training is meaningless
-    if df["label"].nunique() < 2:
-        raise ValueError(
-            "All labels are the same (all 0 or all 1). Add more diverse URLs or use a different temporary label rule.")
+    rng = np.random.default_rng(seed)
+    idx = np.sort(idx)  # sequential reads from the memory map
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X,
-        y,
-        test_size=0.3,
-        random_state=42
+    scaler = StandardScaler()
+    for b in _batches(idx, chunk_size):
+        scaler.partial_fit(X[b])
+
+    counts = np.bincount(y[idx], minlength=2)
+    class_weight = len(idx) / (2.0 * np.maximum(counts, 1))
+
+    model = SGDClassifier(loss="log_loss", alpha=alpha, penalty=penalty, random_state=seed)
+    batches = list(_batches(idx, chunk_size))
+    for _ in range(epochs):
+        for i in rng.permutation(len(batches)):
+            b = batches[i]
+            yb = np.asarray(y[b])
+            model.partial_fit(scaler.transform(X[b]), yb, classes=[0, 1], sample_weight=class_weight[yb])
+    return scaler, model
+
+
+def evaluate(X, y, idx, scaler, model, chunk_size: int) -> Dict[str, float]:
+    import numpy as np
+    from sklearn.metrics import accuracy_score, log_loss, roc_auc_score
+
+    idx = np.sort(idx)
+    proba = np.concatenate([model.predict_proba(scaler.transform(X[b]))[:, 1] for b in _batches(idx, chunk_size)])
+    truth = np.asarray(y[idx])
+    return {
+        "roc_auc": float(roc_auc_score(truth, proba)) if len(set(truth.tolist())) == 2 else float("nan"),
+        "log_loss": float(log_loss(truth, proba, labels=[0, 1])),
+        "accuracy": float(accuracy_score(truth, proba >= 0.5)),
+    }
+
+
+def _cv_task(x_path, y_path, shape, train_idx, val_idx, alpha, penalty, epochs, chunk_size, seed):
+    # Runs in a worker process: opens its own mapping of the shared matrix
+    X, y = open_matrix(x_path, y_path, *shape)
+    t0 = time.perf_counter()
+    scaler, model = fit_streaming(X, y, train_idx, alpha, penalty, epochs, chunk_size, seed)
+    scores = evaluate(X, y, val_idx, scaler, model, chunk_size)
+    scores["fit_seconds"] = time.perf_counter() - t0
+    scores["peak_rss_mb"] = peak_rss_mb()
+    return alpha, penalty, scores
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Train the risk model out of core with parallel CV.")
+    parser.add_argument("--source", action="append", required=True, help="PATH[:LABEL], repeatable")
+    parser.add_argument("--model-out", default=str(DEFAULT_MODEL_PATH), help="Where to write the model (joblib)")
+    parser.add_argument("--alphas", default="1e-5,1e-4,1e-3,1e-2", help="Comma-separated SGD alphas to try")
+    parser.add_argument("--penalties", default="l2,l1", help="Comma-separated penalties to try")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=5, help="Passes over the data per fit")
+    parser.add_argument("--chunk-size", type=int, default=10_000, help="Rows per mini-batch / read chunk")
+    parser.add_argument("--jobs", type=int, default=-1, help="Parallel CV workers (-1 = all cores)")
+    parser.add_argument("--exclude", default=",".join(DEFAULT_EXCLUDED_FEATURES), help="Features to leave out")
+    parser.add_argument(
+        "--intersect-features",
+        action="store_true",
+        help="Train on the features all sources share instead of failing when they differ",
     )
+    parser.add_argument("--workdir", default=None, help="Keep the feature matrix here (default: temp dir)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    import joblib
+    import numpy as np
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    timings: Dict[str, float] = {}
+    t_run = time.perf_counter()
+
+    sources = [_parse_source(s) for s in args.source]
+    excluded = {f for f in args.exclude.split(",") if f}
+
+    t0 = time.perf_counter()
+    per_source, n_rows = scan_sources(sources, excluded)
+    features = feature_schema(sources, per_source, args.intersect_features)
+    timings["scan_seconds"] = time.perf_counter() - t0
+    if n_rows < args.folds * 2:
+        raise ValueError(f"Need at least {args.folds * 2} labeled rows; got {n_rows}.")
+
+    tmp = None
+    if args.workdir:
+        workdir = Path(args.workdir)
+        workdir.mkdir(parents=True, exist_ok=True)
+    else:
+        tmp = tempfile.TemporaryDirectory(prefix="linkscrapper-train-")
+        workdir = Path(tmp.name)
+
+    try:
+        t0 = time.perf_counter()
+        x_path, y_path, n_rows = build_matrix(sources, features, workdir, args.chunk_size)
+        timings["build_matrix_seconds"] = time.perf_counter() - t0
+        shape = (n_rows, len(features))
+        X, y = open_matrix(x_path, y_path, *shape)
+
+        counts = np.bincount(y, minlength=2)
+        print(f"{n_rows} rows x {len(features)} features (benign={counts[0]}, malicious={counts[1]})")
+        if counts.min() < args.folds:
+            raise ValueError(f"Each class needs at least {args.folds} rows for {args.folds}-fold CV.")
+
+        # CV: every (params, fold) pair is one parallel task
+        grid = [
+            (float(a), p)
+            for a in args.alphas.split(",")
+            for p in args.penalties.split(",")
+        ]
+        folds = list(StratifiedKFold(args.folds, shuffle=True, random_state=args.seed).split(np.zeros(n_rows), y))
+        t0 = time.perf_counter()
+        results = Parallel(n_jobs=args.jobs)(
+            delayed(_cv_task)(
+                x_path, y_path, shape, train_idx, val_idx,
+                alpha, penalty, args.epochs, args.chunk_size, args.seed,
+            )
+            for (alpha, penalty), (train_idx, val_idx) in itertools.product(grid, folds)
+        )
+        timings["cv_seconds"] = time.perf_counter() - t0
+
+        cv: List[Dict] = []
+        for alpha, penalty in grid:
+            fold_scores = [s for a, p, s in results if (a, p) == (alpha, penalty)]
+            cv.append({
+                "alpha": alpha,
+                "penalty": penalty,
+                **{
+                    k: float(np.nanmean([s[k] for s in fold_scores]))
+                    for k in ("roc_auc", "log_loss", "accuracy", "fit_seconds")
+                },
+            })
+        cv.sort(key=lambda r: (-np.nan_to_num(r["roc_auc"]), r["log_loss"]))
+        print("=== Cross-validation (mean over folds) ===")
+        for r in cv:
+            print(
+                f"alpha={r['alpha']:<8g} penalty={r['penalty']:<3} "
+                f"roc_auc={r['roc_auc']:.4f} log_loss={r['log_loss']:.4f} accuracy={r['accuracy']:.4f}"
+            )
+        best = cv[0]
+
+        t0 = time.perf_counter()
+        scaler, model = fit_streaming(
+            X, y, np.arange(n_rows), best["alpha"], best["penalty"], args.epochs, args.chunk_size, args.seed
+        )
+        timings["final_fit_seconds"] = time.perf_counter() - t0
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    model_out = Path(args.model_out)
+    model_out.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump({"features": features, "scaler": scaler, "model": model, "params": best}, model_out)
 
-    model = LogisticRegression(max_iter=1000)
-    model.fit(X_train, y_train)
+    timings["wall_seconds"] = time.perf_counter() - t_run
+    report = {
+        "rows": n_rows,
+        "features": len(features),
+        "best": best,
+        "cv": cv,
+        "timings": {k: round(v, 3) for k, v in timings.items()},
+        "peak_rss_mb": {
+            "main": peak_rss_mb(),
+            # workers are long-lived: this is the largest one seen, not a sum
+            "cv_worker": max((s["peak_rss_mb"] or 0.0 for _, _, s in results), default=None),
+        },
+    }
+    model_out.with_suffix(".json").write_text(json.dumps(report, indent=2), encoding="utf-8")
 
-    # Evaluate
-    preds = model.predict(X_test)
-    print("=== Classification report ===")
-    print(classification_report(y_test, preds))
+    print(f"Best: alpha={best['alpha']:g} penalty={best['penalty']} roc_auc={best['roc_auc']:.4f}")
+    print("Timings: " + ", ".join(f"{k}={v:.2f}s" for k, v in timings.items()))
+    print(f"Peak RSS (MB): {report['peak_rss_mb']}")
+    print(f"✅ Model written to {model_out} (report: {model_out.with_suffix('.json')})")
 
 
 if __name__ == "__main__":
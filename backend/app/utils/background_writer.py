@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+class BackgroundAppender:
+    """
+    Append-only file written by a daemon thread, so callers on the event
+    loop only enqueue. `encode` turns an item into the bytes to append and
+    runs on the writer thread. The file stays open and is flushed whenever
+    the queue drains; close() writes out whatever is still queued (the
+    thread is started again by the next put).
+    """
+
+    def __init__(self, path: str, encode: Callable[[Any], bytes], name: str = "background-writer"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._encode = encode
+        self._name = name
+        self._queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def put(self, item: Any) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name=self._name, daemon=True)
+                self._thread.start()
+        self._queue.put(item)
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _write_loop(self) -> None:
+        with open(self.path, "ab") as f:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                f.write(self._encode(item))
+                if self._queue.empty():
+                    f.flush()
+
+
+_STOP = object()
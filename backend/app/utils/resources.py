@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+import sys
+from typing import Optional
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process (None where `resource` is missing, e.g. Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 1)
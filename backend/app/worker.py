@@ -0,0 +1,245 @@
+"""
+Analysis worker processes.
+
+    LINKSCRAPPER_JOB_EXECUTION=queue uvicorn backend.app.main:app
+    LINKSCRAPPER_JOB_EXECUTION=queue python -m backend.app.worker --processes 4 --metrics-port 9100
+
+Each process claims jobs from the shared database (see core/jobqueue.py),
+runs them through its own scheduler lanes and adaptive concurrency limit,
+heartbeats the leases of everything it holds, and delivers webhook
+callbacks from the outbox. Start workers on as many hosts as needed
+against the same (Postgres) database.
+
+SIGTERM/SIGINT: stop claiming, give running jobs a grace period, then hand
+whatever is left back to the queue.
+
+In queue mode the API process runs no jobs, so job, stage, fetch, lane and
+concurrency metrics live in the workers. With --metrics-port N, process i
+serves its own registry at http://<host>:N+i/metrics; scrape each one as a
+separate target (Prometheus sums across instances).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+from typing import Optional, Set
+
+from backend.app.core import archive, tracing, webhooks
+from backend.app.core.jobqueue import LEASE_SECONDS, ClaimedJob, claim_jobs, release_jobs, renew_leases
+from backend.app.core.metrics import REGISTRY
+from backend.app.core.scheduler import LANE_WEIGHTS
+
+POLL_INTERVAL_SECONDS = 0.5
+ERROR_BACKOFF_MAX_SECONDS = 30.0
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("LINKSCRAPPER_WORKER_SHUTDOWN_GRACE_SECONDS", "30"))
+
+
+async def _sleep_until(stop: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _in_executor(fn, *args):
+    # jobqueue calls block (SQLite may wait up to its busy timeout); keep them off the loop
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def _heartbeat(worker_id: str, held: Set[str]) -> None:
+    # Runs until cancelled, so leases stay alive through the shutdown grace period.
+    # A failed renewal is retried on the next beat: leases last three beats.
+    while True:
+        await asyncio.sleep(LEASE_SECONDS / 3)
+        if not held:
+            continue
+        ids = list(held)
+        try:
+            renewed = await _in_executor(renew_leases, worker_id, ids)
+        except Exception as e:
+            print(f"[{worker_id}] lease renewal failed: {e}")
+            continue
+        if renewed < len(ids):
+            print(f"[{worker_id}] lost {len(ids) - renewed} lease(s)")
+
+
+async def _metrics_server(host: str, port: int) -> asyncio.AbstractServer:
+    """
+    Minimal HTTP endpoint for GET /metrics (same exposition as the API's).
+    """
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            while await asyncio.wait_for(reader.readline(), timeout=5) not in (b"\r\n", b"\n", b""):
+                pass  # headers
+            parts = request_line.split()
+            if len(parts) >= 2 and parts[0] == b"GET" and parts[1].split(b"?")[0] == b"/metrics":
+                # Some gauges query the database at scrape time
+                status, body = b"200 OK", (await _in_executor(REGISTRY.render)).encode("utf-8")
+            else:
+                status, body = b"404 Not Found", b"Not found\n"
+            writer.write(
+                b"HTTP/1.1 " + status + b"\r\n"
+                b"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                b"Content-Length: " + str(len(body)).encode("ascii") + b"\r\n"
+                b"Connection: close\r\n\r\n" + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def serve(
+    worker_id: str,
+    poll_interval: float = POLL_INTERVAL_SECONDS,
+    metrics_host: str = "0.0.0.0",
+    metrics_port: Optional[int] = None,
+) -> None:
+    # Imported here so the parent process does not build a scheduler/client
+    from backend.app.api.analyze import run_analysis_job, scheduler
+    from backend.app.core.fetcher import DEFAULT_TOTAL_BUDGET_SECONDS, close_client
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    held: Set[str] = set()  # claimed and not finished, queued locally or running
+
+    def job_factory(job: ClaimedJob):
+        async def run() -> None:
+            try:
+                await run_analysis_job(
+                    analysis_id=job.analysis_id,
+                    input_url=job.input_url,
+                    follow_redirects=True if job.follow_redirects is None else job.follow_redirects,
+                    max_redirects=10 if job.max_redirects is None else job.max_redirects,
+                    time_budget_seconds=job.time_budget_seconds or DEFAULT_TOTAL_BUDGET_SECONDS,
+                    lease_owner=worker_id,
+                )
+            finally:
+                held.discard(job.analysis_id)
+        return run
+
+    dispatcher = None
+    if webhooks.WEBHOOKS_ENABLED:
+        dispatcher = webhooks.WebhookDispatcher(owner=worker_id)
+        dispatcher.start()
+
+    metrics = None
+    if metrics_port is not None:
+        metrics = await _metrics_server(metrics_host, metrics_port)
+
+    heartbeat = asyncio.create_task(_heartbeat(worker_id, held))
+    print(f"[{worker_id}] started" + (f", metrics on :{metrics_port}" if metrics else ""))
+    error_backoff = poll_interval
+    try:
+        while not stop.is_set():
+            # Only claim what can start now; the rest stays available to other workers
+            free = scheduler.limit - scheduler.running - sum(scheduler.queued(l) for l in LANE_WEIGHTS)
+            try:
+                jobs = await _in_executor(claim_jobs, worker_id, free) if free > 0 else []
+            except Exception as e:  # keep serving after e.g. a DB hiccup
+                print(f"[{worker_id}] claim failed: {e}")
+                await _sleep_until(stop, error_backoff)
+                error_backoff = min(ERROR_BACKOFF_MAX_SECONDS, error_backoff * 2)
+                continue
+            error_backoff = poll_interval
+            for job in jobs:
+                held.add(job.analysis_id)
+                lane = job.priority if job.priority in LANE_WEIGHTS else "interactive"
+                scheduler.submit(lane, job_factory(job))
+            if not jobs:
+                await _sleep_until(stop, poll_interval)
+            else:
+                await asyncio.sleep(0)
+
+        print(f"[{worker_id}] stopping, {len(held)} job(s) in hand")
+        deadline = loop.time() + SHUTDOWN_GRACE_SECONDS
+        while scheduler.running and loop.time() < deadline:
+            await asyncio.sleep(0.2)
+    finally:
+        # Stop the jobs first: one finishing after its release could
+        # overwrite (or double-deliver) the next worker's result
+        unfinished = set(held)
+        await scheduler.cancel_all()
+        try:
+            released = await _in_executor(release_jobs, worker_id, unfinished)
+        except Exception as e:  # their leases expire and other workers pick them up
+            print(f"[{worker_id}] could not release unfinished jobs: {e}")
+        else:
+            if released:
+                print(f"[{worker_id}] released {released} unfinished job(s)")
+        heartbeat.cancel()
+        if metrics is not None:
+            metrics.close()
+        if dispatcher is not None:
+            await dispatcher.aclose()
+        await close_client()
+        # Spawned processes exit without running atexit handlers
+        if archive.writer is not None:
+            archive.writer.close()
+        tracing.close()
+
+
+def _process_main(poll_interval: float, metrics_host: str, metrics_port: Optional[int]) -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    asyncio.run(serve(worker_id, poll_interval, metrics_host, metrics_port))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run LinkScrapper analysis worker processes.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Worker processes on this host")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL_SECONDS, help="Seconds between claims when idle")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve /metrics; process i listens on this port + i")
+    parser.add_argument("--metrics-host", default="0.0.0.0", help="Interface for the metrics endpoint")
+    args = parser.parse_args()
+
+    from backend.app.db import ensure_schema
+
+    ensure_schema()
+
+    def port(i: int) -> Optional[int]:
+        return None if args.metrics_port is None else args.metrics_port + i
+
+    if args.processes <= 1:
+        _process_main(args.poll_interval, args.metrics_host, port(0))
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    procs = [
+        ctx.Process(
+            target=_process_main,
+            args=(args.poll_interval, args.metrics_host, port(i)),
+            name=f"linkscrapper-worker-{i}",
+        )
+        for i in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+
+    # Children get SIGINT from the terminal themselves; forward SIGTERM
+    def forward(signum, _frame):
+        for p in procs:
+            if p.is_alive():
+                os.kill(p.pid, signum)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for p in procs:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Must be set before backend.app.db is imported: the engine is built at import time
+_db_dir = tempfile.mkdtemp(prefix="linkscrapper-tests-")
+os.environ["LINKSCRAPPER_DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault("LINKSCRAPPER_WEBHOOKS", "0")
+
+import pytest  # noqa: E402
+
+from backend.app.db import SessionLocal, ensure_schema  # noqa: E402
+from backend.app.models.db_models import Analysis, WebhookOutbox  # noqa: E402
+
+ensure_schema()
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    session.query(WebhookOutbox).delete()
+    session.query(Analysis).delete()
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
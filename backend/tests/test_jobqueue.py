@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta
+
+from backend.app import worker
+from backend.app.api import analyze
+from backend.app.core import jobqueue
+from backend.app.models.db_models import Analysis, WebhookOutbox
+
+
+def _add(db, analysis_id, status="queued", priority="interactive", lease_owner=None,
+         lease_expires_at=None, attempts=0, created_at=None, callback_url=None):
+    row = Analysis(
+        id=analysis_id,
+        input_url=f"http://{analysis_id}.example.invalid/",
+        status=status,
+        priority=priority,
+        lease_owner=lease_owner,
+        lease_expires_at=lease_expires_at,
+        attempts=attempts,
+        callback_url=callback_url,
+        created_at=created_at or datetime.utcnow(),
+    )
+    db.add(row)
+    db.commit()
+    return row
+
+
+def _get(db, analysis_id) -> Analysis:
+    db.expire_all()
+    return db.query(Analysis).filter(Analysis.id == analysis_id).one()
+
+
+def _past(seconds=5):
+    return datetime.utcnow() - timedelta(seconds=seconds)
+
+
+def test_claim_order_is_lane_then_age(db):
+    _add(db, "bulk-old", priority="bulk", created_at=_past(60))
+    _add(db, "inter-new", priority="interactive", created_at=_past(1))
+    _add(db, "inter-old", priority="interactive", created_at=_past(30))
+    _add(db, "inline", lease_owner=jobqueue.INLINE_OWNER)
+
+    claimed = jobqueue.claim_jobs("w1", 2)
+
+    assert sorted(j.analysis_id for j in claimed) == ["inter-new", "inter-old"]
+    row = _get(db, "inter-old")
+    assert (row.status, row.lease_owner, row.attempts) == ("running", "w1", 1)
+    assert [j.analysis_id for j in jobqueue.claim_jobs("w2", 5)] == ["bulk-old"]  # never the inline row
+
+
+def test_a_row_is_claimed_once(db):
+    _add(db, "only")
+    assert len(jobqueue.claim_jobs("w1", 1)) == 1
+    assert jobqueue.claim_jobs("w2", 1) == []
+
+
+def test_expired_lease_is_reclaimed(db):
+    _add(db, "stale", status="running", lease_owner="dead", lease_expires_at=_past(), attempts=1)
+    _add(db, "live", status="running", lease_owner="busy", lease_expires_at=datetime.utcnow() + timedelta(seconds=60), attempts=1)
+
+    claimed = jobqueue.claim_jobs("w1", 5)
+
+    assert [(j.analysis_id, j.attempt) for j in claimed] == [("stale", 2)]
+    assert _get(db, "stale").lease_owner == "w1"
+    assert _get(db, "live").lease_owner == "busy"
+
+
+def test_exhausted_job_fails_and_queues_its_callback(db, monkeypatch):
+    monkeypatch.setattr(jobqueue, "_last_sweep", 0.0)
+    _add(db, "exhausted", status="running", lease_owner="dead", lease_expires_at=_past(),
+         attempts=jobqueue.MAX_ATTEMPTS, callback_url="https://hooks.example/cb")
+
+    assert jobqueue.claim_jobs("w1", 5) == []
+
+    row = _get(db, "exhausted")
+    assert row.status == "error"
+    assert [o.analysis_id for o in db.query(WebhookOutbox)] == ["exhausted"]
+
+
+def test_exhausted_job_is_not_claimed_between_sweeps(db, monkeypatch):
+    monkeypatch.setattr(jobqueue, "_last_sweep", float("inf"))  # sweep not due
+    _add(db, "exhausted", status="running", lease_owner="dead", lease_expires_at=_past(),
+         attempts=jobqueue.MAX_ATTEMPTS)
+
+    assert jobqueue.claim_jobs("w1", 5) == []
+    assert _get(db, "exhausted").status == "running"
+
+
+def test_renew_only_extends_own_leases(db):
+    soon = datetime.utcnow() + timedelta(seconds=1)
+    _add(db, "mine", status="running", lease_owner="w1", lease_expires_at=soon)
+    _add(db, "theirs", status="running", lease_owner="w2", lease_expires_at=soon)
+
+    assert jobqueue.renew_leases("w1", ["mine", "theirs"]) == 1
+    assert _get(db, "mine").lease_expires_at > soon
+    assert _get(db, "theirs").lease_expires_at == soon
+
+
+def test_release_requeues_without_counting_the_attempt(db):
+    _add(db, "held", status="running", lease_owner="w1", lease_expires_at=datetime.utcnow(), attempts=2)
+    _add(db, "lost", status="running", lease_owner="w2", lease_expires_at=datetime.utcnow(), attempts=1)
+
+    assert jobqueue.release_jobs("w1", ["held", "lost"]) == 1
+    row = _get(db, "held")
+    assert (row.status, row.lease_owner, row.attempts) == ("queued", None, 1)
+    assert _get(db, "lost").lease_owner == "w2"
+
+
+def test_job_without_the_lease_writes_nothing(db):
+    _add(db, "taken", status="running", lease_owner="w2", lease_expires_at=datetime.utcnow() + timedelta(seconds=60),
+         callback_url="https://hooks.example/cb")
+
+    asyncio.run(analyze.run_analysis_job("taken", "http://taken.example.invalid/", True, 10, lease_owner="w1"))
+
+    row = _get(db, "taken")
+    assert (row.status, row.lease_owner, row.progress) == ("running", "w2", 0)
+    assert db.query(WebhookOutbox).count() == 0
+
+
+def test_lease_lost_mid_job_drops_the_final_write(db, monkeypatch):
+    _add(db, "stolen", status="running", lease_owner="w1", lease_expires_at=datetime.utcnow() + timedelta(seconds=60),
+         callback_url="https://hooks.example/cb")
+
+    async def fetch_then_lose_lease(**kwargs):
+        session = analyze.SessionLocal()
+        session.query(Analysis).filter(Analysis.id == "stolen").update({"lease_owner": "w2"})
+        session.commit()
+        session.close()
+        raise RuntimeError("network down")
+
+    monkeypatch.setattr(analyze, "fetch_url", fetch_then_lose_lease)
+    asyncio.run(analyze.run_analysis_job("stolen", "http://stolen.example.invalid/", True, 10, lease_owner="w1"))
+
+    row = _get(db, "stolen")
+    assert (row.status, row.lease_owner, row.error) == ("running", "w2", None)
+    assert db.query(WebhookOutbox).count() == 0
+
+
+def test_inline_job_error_is_recorded(db, monkeypatch):
+    _add(db, "inline", lease_owner=jobqueue.INLINE_OWNER, callback_url="https://hooks.example/cb")
+
+    async def failing_fetch(**kwargs):
+        raise RuntimeError("network down")
+
+    monkeypatch.setattr(analyze, "fetch_url", failing_fetch)
+    asyncio.run(analyze.run_analysis_job("inline", "http://inline.example.invalid/", True, 10))
+
+    row = _get(db, "inline")
+    assert (row.status, row.error) == ("error", "network down")
+    assert db.query(WebhookOutbox).count() == 1
+
+
+def test_heartbeat_survives_a_failed_renewal(monkeypatch):
+    calls = []
+
+    def flaky_renew(worker_id, ids):
+        calls.append(list(ids))
+        if len(calls) == 1:
+            raise RuntimeError("database is locked")
+        return len(ids)
+
+    monkeypatch.setattr(worker, "LEASE_SECONDS", 0.03)
+    monkeypatch.setattr(worker, "renew_leases", flaky_renew)
+
+    async def run():
+        task = asyncio.create_task(worker._heartbeat("w1", {"a"}))
+        await asyncio.sleep(0.1)
+        assert not task.done()
+        task.cancel()
+
+    asyncio.run(run())
+    assert len(calls) >= 2
@@ -0,0 +1,76 @@
+"""
+Bytes read and CPU time per page for the streaming HTML inspector.
+
+Feeds synthetic pages to HtmlInspector in network-sized chunks and compares
+against reading the whole body (what the fetcher did before), without any
+network involved.
+
+Usage:
+    python -m benchmarks.bench_html_inspect --pages 200
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Dict, List, Tuple
+
+from backend.app.core.html_inspect import HtmlInspector
+from benchmarks.common import save_results
+
+CHUNK = 16_384
+
+_FILLER = b"<p>" + b"lorem ipsum dolor sit amet " * 40 + b"</p>\n"
+
+
+def _pages() -> List[Tuple[str, bytes]]:
+    head_signals = (
+        b"<head><meta http-equiv='refresh' content='0;url=/x'>"
+        b"<script>window.location.href='/x'</script></head>"
+    )
+    phish_form = b"<form action='https://collector.example/p'><input type='password'></form>"
+    return [
+        ("small_plain", b"<html><body>" + _FILLER * 4 + b"</body></html>"),
+        ("phish_top", b"<html>" + head_signals + b"<body>" + phish_form + _FILLER * 400 + b"</body></html>"),
+        ("phish_bottom", b"<html>" + head_signals + b"<body>" + _FILLER * 400 + phish_form + b"</body></html>"),
+        ("large_plain", b"<html><body>" + _FILLER * 400 + b"</body></html>"),
+    ]
+
+
+def _inspect(body: bytes) -> Tuple[int, float]:
+    t0 = time.process_time()
+    inspector = HtmlInspector("https://site.example/login")
+    complete = True
+    for i in range(0, len(body), CHUNK):
+        if not inspector.feed(body[i:i + CHUNK]):
+            complete = False
+            break
+    page = inspector.close(complete)
+    return page.bytes_read, time.process_time() - t0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the streaming HTML inspector.")
+    parser.add_argument("--pages", type=int, default=200, help="Iterations per page type")
+    parser.add_argument("--out", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    rows: List[Dict] = []
+    for name, body in _pages():
+        bytes_read, cpu = 0, 0.0
+        for _ in range(args.pages):
+            b, c = _inspect(body)
+            bytes_read, cpu = b, cpu + c
+        rows.append({
+            "page": name,
+            "body_bytes": len(body),
+            "bytes_read": bytes_read,
+            "bytes_saved_pct": round(100 * (1 - bytes_read / len(body)), 1),
+            "cpu_ms_per_page": round(cpu / args.pages * 1000, 3),
+        })
+        print(rows[-1])
+
+    print(f"Results written to {save_results('html_inspect', {'pages': rows}, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+HTTP/1.1 vs HTTP/2 benchmark for the shared fetch client.
+
+Starts a local hypercorn server (cleartext h2 via prior knowledge), then runs
+the same batch of concurrent fetch_url calls over each protocol and reports
+latency and how many connections each protocol needed.
+
+Usage:
+    python -m benchmarks.bench_http2 --requests 200 --concurrency 50
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+from backend.app.core import fetcher
+from benchmarks.common import latency_summary_ms, save_results
+
+
+async def _app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await asyncio.sleep(0.01)  # emulate a little server think time
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [(b"content-type", b"text/html")],
+    })
+    await send({"type": "http.response.body", "body": b"<html>ok</html>"})
+
+
+async def _serve(port: int, shutdown: asyncio.Event) -> None:
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"localhost:{port}"]
+    config.loglevel = "WARNING"
+    await serve(_app, config, shutdown_trigger=shutdown.wait)
+
+
+async def _run(label: str, http2: bool, url: str, n: int, concurrency: int) -> Dict:
+    # http1=False forces prior-knowledge h2 over cleartext (no TLS/ALPN locally)
+    client = fetcher.build_client(http2=http2, http1=not http2)
+    fetcher.set_client(client)
+    fetcher._responses_by_protocol.clear()
+
+    sem = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one(i: int) -> None:
+        async with sem:
+            t0 = time.perf_counter()
+            await fetcher.fetch_url(f"{url}?i={i}", total_budget_seconds=None)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - t0
+
+    stats = fetcher.connection_stats()
+    await fetcher.close_client()
+
+    return {
+        "protocol": label,
+        "requests": n,
+        "concurrency": concurrency,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(n / wall, 1),
+        "latency": latency_summary_ms(latencies),
+        "connections": stats["open_connections"],
+        "responses": stats["responses"],
+    }
+
+
+async def main_async(args) -> List[Dict]:
+    shutdown = asyncio.Event()
+    server = asyncio.create_task(_serve(args.port, shutdown))
+    await asyncio.sleep(0.5)
+
+    url = f"http://localhost:{args.port}/page"
+    try:
+        results = [
+            await _run("HTTP/1.1", False, url, args.requests, args.concurrency),
+            await _run("HTTP/2", True, url, args.requests, args.concurrency),
+        ]
+    finally:
+        shutdown.set()
+        await server
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark HTTP/1.1 vs HTTP/2 in the fetcher.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--out", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    runs = asyncio.run(main_async(args))
+    for r in runs:
+        print(f"{r['protocol']}: {r['throughput_rps']} req/s, {r['latency']}, connections={r['connections']}")
+    print(f"Results written to {save_results('http2', {'runs': runs}, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
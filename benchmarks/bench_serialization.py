@@ -0,0 +1,159 @@
+"""
+Bytes per row and encode/decode time for stored analysis results.
+
+Compares the old storage format (stdlib json text) with what
+core/serialization.py writes (orjson bytes, optionally gzip), plus msgpack
+when it is installed. "serve" is the cost of turning the stored value into a
+response body: decode + re-encode for the old path, nothing (or a gunzip for
+clients without gzip) for stored bytes.
+
+Payloads come from a LinkScrapper database when --db is given, otherwise a
+synthetic payload shaped like a real result is used.
+
+Usage:
+    python -m benchmarks.bench_serialization --db linkscrapper.db
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from backend.app.core import serialization
+from benchmarks.common import save_results
+
+
+def _synthetic_payload() -> Dict[str, Any]:
+    features = {f"feature_{i}": (i % 7) / 7 for i in range(40)}
+    return {
+        "analysis_id": "5f0c2d7e-8a51-4d0e-9a55-1b4f6f0f2a10",
+        "url": "https://bit.ly/3abcdef",
+        "status": "done",
+        "message": "Risk medium (45/100)",
+        "final_url": "https://login.example-secure-account.com/verify?session=abc123",
+        "http_status": 200,
+        "redirect_chain": [
+            {"url": "https://bit.ly/3abcdef", "status_code": 301},
+            {"url": "http://example-secure-account.com/", "status_code": 302},
+            {"url": "https://login.example-secure-account.com/verify?session=abc123", "status_code": 200},
+        ],
+        "content_type": "text/html; charset=utf-8",
+        "server": "nginx",
+        "truncated": False,
+        "headers": {
+            "content-type": "text/html; charset=utf-8",
+            "server": "nginx",
+            "strict-transport-security": "max-age=31536000",
+            "x-frame-options": "DENY",
+        },
+        "page": {
+            "has_password_field": True,
+            "external_form_action": True,
+            "has_meta_refresh": False,
+            "has_script_redirect": False,
+            "bytes_read": 16384,
+            "complete": False,
+        },
+        "risk_score": 45,
+        "risk_level": "medium",
+        "reasons": ["Uses a URL shortener", "Password field posts to another host", "Multiple redirects"],
+        "features": features,
+    }
+
+
+def _load_payloads(db_path: str, limit: int) -> List[Dict[str, Any]]:
+    con = sqlite3.connect(db_path)
+    try:
+        cols = {r[1] for r in con.execute("PRAGMA table_info(analyses)")}
+        expr = "COALESCE(result_blob, result_json)" if "result_blob" in cols else "result_json"
+        rows = con.execute(
+            f"SELECT {expr} FROM analyses WHERE status = 'done' AND {expr} IS NOT NULL LIMIT ?",
+            (limit,),
+        ).fetchall()
+    finally:
+        con.close()
+    return [
+        serialization.load_blob(v.encode("utf-8") if isinstance(v, str) else v)
+        for (v,) in rows
+    ]
+
+
+def _formats() -> List[Tuple[str, Callable[[Any], bytes], Callable[[bytes], Any], Callable[[bytes], bytes]]]:
+    """
+    (name, encode, decode, serve) per format.
+    """
+    def json_text_serve(b: bytes) -> bytes:
+        # what GET /analysis used to do: json.loads, then FastAPI's json.dumps
+        return json.dumps(json.loads(b)).encode("utf-8")
+
+    formats = [
+        ("json_text", lambda p: json.dumps(p).encode("utf-8"), json.loads, json_text_serve),
+        (
+            "stored_plain",
+            lambda p: serialization.dump_result(p, compress=False),
+            serialization.load_blob,
+            lambda b: b,
+        ),
+        (
+            "stored_gzip",
+            lambda p: gzip.compress(serialization.dumps(p), compresslevel=6, mtime=0),
+            serialization.load_blob,
+            gzip.decompress,  # worst case: client without Accept-Encoding: gzip
+        ),
+    ]
+    try:
+        import msgpack
+    except ImportError:
+        return formats
+    formats.append((
+        "msgpack",
+        msgpack.packb,
+        msgpack.unpackb,
+        lambda b: serialization.dumps(msgpack.unpackb(b)),
+    ))
+    return formats
+
+
+def _time_per_op(fn: Callable, args: List, repeat: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for a in args:
+            fn(a)
+    return (time.perf_counter() - t0) / (repeat * len(args))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark stored result serialization.")
+    parser.add_argument("--db", default=None, help="SQLite DB to sample payloads from")
+    parser.add_argument("--rows", type=int, default=500, help="Max payloads to sample from --db")
+    parser.add_argument("--repeat", type=int, default=200, help="Passes over the payloads per measurement")
+    parser.add_argument("--out", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    payloads = _load_payloads(args.db, args.rows) if args.db else []
+    source = f"{args.db} ({len(payloads)} rows)" if payloads else "synthetic"
+    if not payloads:
+        payloads = [_synthetic_payload()]
+    print(f"Payloads: {source}; orjson={'yes' if serialization.orjson else 'no'}")
+
+    rows: List[Dict] = []
+    for name, encode, decode, serve in _formats():
+        blobs = [encode(p) for p in payloads]
+        rows.append({
+            "format": name,
+            "bytes_per_row": round(sum(len(b) for b in blobs) / len(blobs), 1),
+            "encode_us": round(_time_per_op(encode, payloads, args.repeat) * 1e6, 2),
+            "decode_us": round(_time_per_op(decode, blobs, args.repeat) * 1e6, 2),
+            "serve_us": round(_time_per_op(serve, blobs, args.repeat) * 1e6, 2),
+        })
+        print(rows[-1])
+
+    results = {"source": source, "orjson": serialization.orjson is not None, "formats": rows}
+    print(f"Results written to {save_results('serialization', results, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Cold-start benchmark: import cost of the API and time until it serves requests.
+
+- import: runs `python -X importtime -c "import backend.app.main"` in a fresh
+  interpreter and reports total time plus the slowest top-level packages
+- readiness: starts uvicorn in a subprocess on a throwaway DB and polls GET /
+  until it answers (process spawn + imports + lifespan startup)
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.common import save_results
+
+TARGET_READY_SECONDS = 1.0
+
+
+def _importtime(module: str) -> Tuple[float, Dict[str, float]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    # lines: "import time: <self us> | <cumulative us> | <indented module name>"
+    total_us = 0
+    per_package: Dict[str, float] = defaultdict(float)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        per_package[name.strip().split(".")[0]] += int(self_us) / 1e6
+        if not name[1:].startswith(" "):  # top-level import (one leading space)
+            total_us += int(cumulative_us)
+    return total_us / 1e6, dict(per_package)
+
+
+def _time_to_ready(port: int, db_url: str, timeout: float = 30.0) -> float:
+    env = dict(os.environ, LINKSCRAPPER_DATABASE_URL=db_url)
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app",
+         "--host", "localhost", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                if httpx.get(f"http://localhost:{port}/", timeout=0.5).status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.TransportError:
+                pass
+            time.sleep(0.01)
+        raise TimeoutError("API did not become ready")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark API import time and time-to-ready.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to report")
+    parser.add_argument("--out", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    import_runs: List[float] = []
+    packages: Dict[str, float] = {}
+    for _ in range(args.runs):
+        total, packages = _importtime("backend.app.main")
+        import_runs.append(total)
+
+    db_dir = tempfile.mkdtemp(prefix="linkscrapper-startup-")
+    ready_runs = [
+        # first run creates the schema, later runs hit the cached version check
+        _time_to_ready(args.port, f"sqlite:///{os.path.join(db_dir, 'startup.db')}")
+        for _ in range(args.runs)
+    ]
+
+    slowest = sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[: args.top]
+    results = {
+        "import_seconds_median": round(statistics.median(import_runs), 4),
+        "ready_seconds_first": round(ready_runs[0], 4),
+        "ready_seconds_median": round(statistics.median(ready_runs), 4),
+        "target_ready_seconds": TARGET_READY_SECONDS,
+        "slowest_packages_seconds": {k: round(v, 4) for k, v in slowest},
+    }
+    for k, v in results.items():
+        print(f"{k}: {v}")
+    print(f"Results written to {save_results('startup', results, args.out)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Shared helpers for the benchmark scripts: percentiles, peak RSS and result files.
+"""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.app.utils.resources import peak_rss_mb  # noqa: F401  re-exported for the benchmark scripts
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile; values do not need to be sorted.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def latency_summary_ms(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2) if values else 0.0,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(name: str, results: Dict[str, Any], out: Optional[str] = None) -> Path:
+    """
+    Write results as JSON, tagged with commit and timestamp so runs can be diffed.
+    """
+    commit = git_commit()
+    results = {
+        "benchmark": name,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **results,
+    }
+    if out:
+        path = Path(out)
+    else:
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"{name}-{stamp}-{commit or 'nogit'}.json"
+    os.makedirs(path.parent, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return path
@@ -0,0 +1,48 @@
+"""
+Compare two benchmark result files side by side (numeric fields only).
+
+Usage:
+    python -m benchmarks.compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from typing import Any, Dict, Iterable, Tuple
+
+
+def _flatten(obj: Any, prefix: str = "") -> Iterable[Tuple[str, float]]:
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from _flatten(v, f"{prefix}{k}.")
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            yield from _flatten(v, f"{prefix}{i}.")
+    elif isinstance(obj, (int, float)) and not isinstance(obj, bool):
+        yield prefix.rstrip("."), float(obj)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Diff two benchmark JSON files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+
+    with open(args.before, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(args.after, encoding="utf-8") as f:
+        after = json.load(f)
+
+    a: Dict[str, float] = dict(_flatten(before))
+    b: Dict[str, float] = dict(_flatten(after))
+
+    print(f"{'metric':<40} {before.get('commit')!s:>12} {after.get('commit')!s:>12} {'change':>9}")
+    for key in sorted(a.keys() & b.keys()):
+        if key.startswith("params."):
+            continue
+        change = f"{(b[key] - a[key]) / a[key] * 100:+.1f}%" if a[key] else "n/a"
+        print(f"{key:<40} {a[key]:>12g} {b[key]:>12g} {change:>9}")
+
+
+if __name__ == "__main__":
+    main()
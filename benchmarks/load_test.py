@@ -0,0 +1,179 @@
+"""
+End-to-end load test: POST /analyze against the local mock web.
+
+Starts the mock web and the API (both uvicorn, in this process) on a fresh
+SQLite file, submits URLs at a fixed concurrency, waits for every job to
+reach done/error by polling GET /analysis/{id}, and reports throughput,
+end-to-end latency percentiles, DB writes and peak RSS.
+
+Usage:
+    python -m benchmarks.load_test --requests 500 --concurrency 50 \
+        --mix chain=4,shortener=2,slow=1,large=1,error=1 --depth 3
+
+Results are written to benchmarks/results/ (or --out) as JSON.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.common import latency_summary_ms, peak_rss_mb, save_results
+
+SCENARIOS = ("chain", "shortener", "slow", "large", "error")
+
+
+def _parse_mix(mix: str) -> Dict[str, int]:
+    weights: Dict[str, int] = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario {name!r}; choose from {SCENARIOS}")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def _scenario_url(base: str, name: str, args) -> str:
+    if name == "chain":
+        return f"{base}/chain/{args.depth}"
+    if name == "shortener":
+        return f"{base}/s/{args.depth}"
+    if name == "slow":
+        return f"{base}/slow/{args.slow_ms}"
+    if name == "large":
+        return f"{base}/large/{args.large_kb}"
+    return f"{base}/status/{random.choice((404, 500, 503))}"
+
+
+class _DbWriteCounter:
+    """
+    Counts INSERT/UPDATE/DELETE statements and commits on the app engine.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements: Counter = Counter()
+        self.commits = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+        event.listen(engine, "commit", self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(" ", 1)[0].upper()
+        if verb in ("INSERT", "UPDATE", "DELETE"):
+            self.statements[verb] += 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+
+async def _start_server(app, port: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="localhost", port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+async def _run(args) -> Dict:
+    import httpx
+
+    from backend.app.db import engine
+    from backend.app.main import app as api_app
+    from benchmarks import mock_web
+
+    writes = _DbWriteCounter(engine)
+    mock_server, mock_task = await _start_server(mock_web.app, args.mock_port)
+    api_server, api_task = await _start_server(api_app, args.api_port)
+
+    base = f"http://localhost:{args.mock_port}"
+    weights = _parse_mix(args.mix)
+    names = random.choices(list(weights), weights=list(weights.values()), k=args.requests)
+
+    latencies: List[float] = []
+    outcomes: Counter = Counter()
+    sem = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://localhost:{args.api_port}", timeout=60) as client:
+
+        async def one(name: str) -> None:
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await client.post("/analyze", json={
+                    "url": _scenario_url(base, name, args),
+                    "priority": args.priority,
+                })
+                analysis_id = resp.json()["analysis_id"]
+                while True:
+                    body = (await client.get(f"/analysis/{analysis_id}")).json()
+                    if body.get("status") in ("done", "error"):
+                        break
+                    await asyncio.sleep(args.poll_interval)
+                latencies.append(time.perf_counter() - t0)
+                outcomes[f"{name}:{body['status']}"] += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(n) for n in names))
+        wall = time.perf_counter() - t0
+
+    for server in (api_server, mock_server):
+        server.should_exit = True
+    await asyncio.gather(api_task, mock_task)
+
+    return {
+        "params": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "mix": weights,
+            "depth": args.depth,
+            "slow_ms": args.slow_ms,
+            "large_kb": args.large_kb,
+            "priority": args.priority,
+        },
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(args.requests / wall, 2),
+        "latency": latency_summary_ms(latencies),
+        "outcomes": dict(outcomes),
+        "db_writes": dict(writes.statements),
+        "db_commits": writes.commits,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test POST /analyze against a local mock web.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--mix", default="chain=4,shortener=2,slow=1,large=1,error=1")
+    parser.add_argument("--depth", type=int, default=3, help="Redirect chain depth")
+    parser.add_argument("--slow-ms", type=int, default=500)
+    parser.add_argument("--large-kb", type=int, default=256)
+    parser.add_argument("--priority", default="interactive", choices=("interactive", "bulk", "background"))
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--api-port", type=int, default=8001)
+    parser.add_argument("--mock-port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=None, help="Result JSON path (default: benchmarks/results/)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    # Point the app at a throwaway DB before backend.app is imported
+    tmpdir = tempfile.mkdtemp(prefix="linkscrapper-bench-")
+    os.environ["LINKSCRAPPER_DATABASE_URL"] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    results = asyncio.run(_run(args))
+    path = save_results("load_test", results, args.out)
+    print(f"Throughput {results['throughput_rps']} req/s, latency {results['latency']}")
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Local ASGI "mock web" used by the benchmarks instead of real sites.
+
+Routes:
+- /page                 small HTML page (200)
+- /chain/{n}            302 -> /chain/{n-1} ... -> /page
+- /s/{n}                shortener-style 301 into /chain/{n}
+- /slow/{ms}            sleeps ms milliseconds, then 200
+- /large/{kb}           200 with a kb-KiB HTML body
+- /status/{code}        returns the given status code
+
+Run standalone:
+    python -m benchmarks.mock_web --port 8765
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from typing import List, Tuple
+
+PAGE = (
+    b"<html><head><title>Mock</title></head>"
+    b"<body><form action='/login'><input type='password' name='p'></form></body></html>"
+)
+
+
+async def _respond(send, status: int, body: bytes = b"", headers: List[Tuple[bytes, bytes]] = None):
+    hdrs = [(b"content-type", b"text/html; charset=utf-8")] + (headers or [])
+    await send({"type": "http.response.start", "status": status, "headers": hdrs})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+
+    parts = [p for p in scope["path"].split("/") if p]
+    route = parts[0] if parts else "page"
+    arg = parts[1] if len(parts) > 1 else "0"
+
+    try:
+        n = int(arg)
+    except ValueError:
+        await _respond(send, 400, b"bad argument")
+        return
+
+    if route == "page":
+        await _respond(send, 200, PAGE)
+    elif route == "chain":
+        location = f"/chain/{n - 1}" if n > 0 else "/page"
+        await _respond(send, 302, headers=[(b"location", location.encode())])
+    elif route == "s":
+        await _respond(send, 301, headers=[(b"location", f"/chain/{n}".encode())])
+    elif route == "slow":
+        await asyncio.sleep(n / 1000.0)
+        await _respond(send, 200, PAGE)
+    elif route == "large":
+        await _respond(send, 200, PAGE + b" " * (n * 1024))
+    elif route == "status":
+        await _respond(send, n, b"status")
+    else:
+        await _respond(send, 404, b"not found")
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve the benchmark mock web.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    uvicorn.run(app, host="localhost", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()